@@ -0,0 +1,229 @@
+# sort_bench.py
+# Description:
+#   Headless throughput benchmark for the sorting pipeline. Generates a
+#   synthetic source tree, then times the scan, rule lookup and collision
+#   resolution phases separately, runs the full move engine and reports its
+#   own per-phase metrics (the "move" phase is the time spent in the moves
+#   themselves) next to the end-to-end "pipeline" time. Prints JSON that can
+#   be saved and compared across commits.
+#
+#   python -m benchmarks.sort_bench --files 20000 --where tmpfs disk --out before.json
+#   python -m benchmarks.sort_bench --files 20000 --compare before.json
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from src.core.move_engine import MoveEngine
+from src.core.name_cache import DestinationNames
+from src.core.rule_engine import parse_size
+from src.core.scanner import ScanOptions, scan_files
+from src.core.sort_core import SortCore
+
+PHASES = ("scan", "lookup", "collisions", "move", "pipeline")
+
+
+def parse_weights(text: str, convert=str) -> list:
+    """'jpg:50,png:20' -> [('jpg', 50.0), ('png', 20.0)]."""
+    pairs = []
+    for part in text.split(","):
+        key, _, weight = part.partition(":")
+        pairs.append((convert(key.strip()), float(weight or 1)))
+    return pairs
+
+
+def tmpfs_root() -> Path:
+    """A RAM-backed temp location where available, else the normal temp dir."""
+    shm = Path("/dev/shm")
+    return shm if shm.is_dir() and os.access(shm, os.W_OK) else Path(tempfile.gettempdir())
+
+
+def build_tree(base: Path, args, rng: random.Random) -> list:
+    """
+    Create the synthetic source tree and the rules for it under `base`.
+    Returns folder_rules. A share of files (collision rate) gets a name that
+    already exists in its destination so collision handling is exercised.
+    """
+    source = base / "source"
+    dest = base / "dest"
+    exts = parse_weights(args.exts)
+    sizes = parse_weights(args.size_dist, parse_size)
+    payload = os.urandom(max(size for size, _ in sizes) or 1)
+
+    # First rules claim the generated extensions, the rest never match
+    rules = []
+    for i in range(max(args.rules, 1)):
+        rule_exts = {"." + ext for j, (ext, _) in enumerate(exts) if j % max(args.rules, 1) == i}
+        rules.append({"name": f"rule{i}", "path": str(dest / f"rule{i}"), "exts": rule_exts or {f".x{i}"}})
+
+    ext_names, ext_weights = zip(*exts)
+    size_values, size_weights = zip(*sizes)
+    dirs = [source] + [source / f"d{i}" for i in range(args.subdirs)]
+    for d in dirs:
+        d.mkdir(parents=True, exist_ok=True)
+
+    for n in range(args.files):
+        ext = rng.choices(ext_names, ext_weights)[0]
+        size = rng.choices(size_values, size_weights)[0]
+        collide = rng.random() < args.collision_rate
+        name = f"IMG_{n % 97:04d}.{ext}" if collide else f"file_{n:07d}.{ext}"
+        folder = dirs[n % len(dirs)]
+        target = folder / name
+        if target.exists():
+            target = folder / f"file_{n:07d}.{ext}"
+        with open(target, "wb") as f:
+            f.write(payload[:size])
+
+    # Pre-existing names in the destinations to collide with
+    for rule in rules:
+        dest_dir = Path(rule["path"])
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        for ext in rule["exts"]:
+            for i in range(97):
+                (dest_dir / f"IMG_{i:04d}{ext}").touch()
+    return rules
+
+
+def run_once(base: Path, args, seed: int) -> dict:
+    rng = random.Random(seed)
+    rules = build_tree(base, args, rng)
+    source = base / "source"
+    options = ScanOptions(recursive=args.subdirs > 0)
+
+    core = SortCore()
+    core.bind_folder_rules(rules)
+    core.move_workers = args.workers
+    core.scan_options = options
+    timings = {}
+
+    started = time.perf_counter()
+    files = list(scan_files(source, options))
+    timings["scan"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    lookup = core.rule_lookup()
+    matched = [(f, lookup(f.suffix)) for f in files]
+    timings["lookup"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    caches = {}
+    for f, rule in matched:
+        if rule:
+            cache = caches.get(rule["path"])
+            if cache is None:
+                cache = caches[rule["path"]] = DestinationNames(Path(rule["path"]))
+            cache.claim(f.name)
+    timings["collisions"] = time.perf_counter() - started
+
+    # Full pipeline, which is what users actually wait for. Its rule lookup,
+    # listing and name claims repeat the phases above, so the move phase is
+    # taken from the engine's own metrics (summed over the worker threads)
+    started = time.perf_counter()
+    totals = MoveEngine(lookup, args.workers).run(iter(files))
+    timings["pipeline"] = time.perf_counter() - started
+    timings["engine"] = totals["metrics"]["phases_s"]
+    timings["move"] = timings["engine"].get("move", 0.0)
+
+    timings["files"] = len(files)
+    timings["moved"] = totals["moved"]
+    timings["bytes"] = totals["bytes"]
+    return timings
+
+
+def run_location(where: str, args) -> dict:
+    root = tmpfs_root() if where == "tmpfs" else Path(tempfile.gettempdir() if where == "disk" else where)
+    runs = []
+    for repeat in range(args.repeat):
+        base = Path(tempfile.mkdtemp(prefix="filesor-bench-", dir=root))
+        try:
+            runs.append(run_once(base, args, args.seed + repeat))
+        finally:
+            shutil.rmtree(base, ignore_errors=True)
+
+    result = {"root": str(root)}
+    for phase in PHASES:
+        result[f"{phase}_s"] = round(statistics.median(r[phase] for r in runs), 4)
+    engine_phases = sorted({name for r in runs for name in r["engine"]})
+    result["engine_phases_s"] = {name: round(statistics.median(r["engine"].get(name, 0.0) for r in runs), 4)
+                                 for name in engine_phases}
+    files = runs[0]["files"]
+    pipeline_s = result["pipeline_s"] or 1e-9
+    result["files"] = files
+    result["moved"] = runs[0]["moved"]
+    # End-to-end throughput: what a user sorting this tree would see
+    result["files_per_s"] = round(files / pipeline_s, 1)
+    result["bytes_per_s"] = round(runs[0]["bytes"] / pipeline_s, 1)
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Phases that got slower than `threshold` (fraction) vs the baseline."""
+    regressions = []
+    for where, result in current["results"].items():
+        old = baseline.get("results", {}).get(where)
+        if not old:
+            continue
+        for phase in PHASES:
+            key = f"{phase}_s"
+            before, after = old.get(key), result.get(key)
+            if before and after and after > before * (1 + threshold):
+                regressions.append(f"{where}.{phase}: {before}s -> {after}s (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the FileSor sorting pipeline.")
+    parser.add_argument("--files", type=int, default=10000, help="Files to generate (default: 10000).")
+    parser.add_argument("--subdirs", type=int, default=0, help="Spread files over N subfolders (recursive scan).")
+    parser.add_argument("--exts", default="jpg:40,png:20,pdf:15,txt:15,zzz:10",
+                        help="Extension mix as ext:weight pairs.")
+    parser.add_argument("--size-dist", default="1k:70,64k:25,1m:5", help="File sizes as size:weight pairs.")
+    parser.add_argument("--rules", type=int, default=50, help="Number of folder rules (default: 50).")
+    parser.add_argument("--collision-rate", type=float, default=0.1,
+                        help="Share of files whose name already exists in the destination.")
+    parser.add_argument("--workers", type=int, default=4, help="Move workers (default: 4).")
+    parser.add_argument("--where", nargs="+", default=["tmpfs", "disk"],
+                        help="'tmpfs', 'disk' or explicit folders to run in.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per location; the median is reported.")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", type=Path, help="Also write the JSON results to this file.")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed slowdown per phase before --compare fails (default: 0.15).")
+    args = parser.parse_args(argv)
+
+    params = {k: v for k, v in vars(args).items() if k not in ("out", "compare", "where")}
+    report = {"revision": git_revision(), "python": sys.version.split()[0], "params": params,
+              "results": {where: run_location(where, args) for where in args.where}}
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        args.out.write_text(text, encoding="utf-8")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# startup_bench.py
+# Description:
+#   Cold-start benchmark for the desktop app. Launches the app in fresh
+#   processes (offscreen by default) and times the import of app_init, the
+#   first painted window and the deferred rules load, with the cached
+#   pyside6-uic form and with QUiLoader. Prints JSON that can be saved and
+#   compared across commits, like sort_bench.
+#
+#   python -m benchmarks.startup_bench --rules 200 --out before.json
+#   python -m benchmarks.startup_bench --rules 200 --compare before.json
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+PHASES = ("import", "window", "painted", "rules")
+MODES = {"compiled": "1", "loader": "0"}     # FILESOR_UI_CACHE per mode
+
+
+def _test_mode_app():
+    """QApplication with Qt's test-mode paths, so user rules and caches are never touched."""
+    from PySide6.QtCore import QStandardPaths
+    from PySide6.QtWidgets import QApplication
+
+    QStandardPaths.setTestModeEnabled(True)
+    app = QApplication(sys.argv[:1])
+    app.setApplicationName("FileSor")
+    return app
+
+
+def child_prepare(rules: int) -> int:
+    """Warm the UI cache and seed the test-mode rules store with `rules` rules."""
+    _test_mode_app()
+    from src.core.app_init import MAIN_WINDOW_UI
+    from src.core.rules_io import RULES_FILENAME
+    from src.core.rules_store import RulesStore, store_path_for
+    from src.fs_ui.ui_loader import compile_ui
+    from PySide6.QtCore import QStandardPaths
+
+    compiled = compile_ui(MAIN_WINDOW_UI, wait=True)
+    base = Path(QStandardPaths.writableLocation(QStandardPaths.AppDataLocation))
+    store = RulesStore(store_path_for(base / RULES_FILENAME))
+    store.replace_all([{"name": f"rule{i}", "path": str(base / "dest" / f"rule{i}"),
+                        "exts": {f".e{i}", f".x{i}"}} for i in range(rules)])
+    store.close()
+    print(json.dumps({"compiled": compiled}))
+    return 0
+
+
+def child_run(started: float) -> int:
+    """One cold start; prints the phase timestamps (seconds since `started`) as JSON."""
+    marks = {"interpreter": time.time() - started}
+    t0 = time.perf_counter()
+    from src.core.app_init import FileSorterApp
+    marks["import"] = time.perf_counter() - t0
+
+    app = _test_mode_app()
+    t1 = time.perf_counter()
+    window = FileSorterApp()
+    window.show()
+    marks["window"] = time.perf_counter() - t1
+    while not window._painted:
+        app.processEvents()
+    marks["painted"] = time.perf_counter() - t1
+    while not window.ui_handler._rules_loaded:
+        app.processEvents()
+    marks["rules"] = time.perf_counter() - t1
+    marks["total"] = time.time() - started
+    marks["rule_count"] = len(window.ui_handler.folder_rules)
+    window.close()
+    print(json.dumps(marks))
+    return 0
+
+
+def run_child(args: list, env: dict) -> dict:
+    out = subprocess.run([sys.executable, "-m", "benchmarks.startup_bench", *args], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run_mode(mode: str, args) -> dict:
+    env = dict(os.environ, FILESOR_UI_CACHE=MODES[mode])
+    env.setdefault("QT_QPA_PLATFORM", args.platform)
+    runs = [run_child(["--child", str(time.time())], env) for _ in range(args.repeat)]
+    result = {f"{phase}_s": round(statistics.median(r[phase] for r in runs), 4) for phase in PHASES}
+    result["total_s"] = round(statistics.median(r["total"] for r in runs), 4)
+    result["rules_loaded"] = runs[0]["rule_count"]
+    return result
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Phases that got slower than `threshold` (fraction) vs the baseline."""
+    regressions = []
+    for mode, result in current["results"].items():
+        old = baseline.get("results", {}).get(mode)
+        if not old:
+            continue
+        for key in [f"{phase}_s" for phase in PHASES] + ["total_s"]:
+            before, after = old.get(key), result.get(key)
+            if before and after and after > before * (1 + threshold):
+                regressions.append(f"{mode}.{key[:-2]}: {before}s -> {after}s (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark FileSor's cold start.")
+    parser.add_argument("--rules", type=int, default=50, help="Rules in the store loaded at startup (default: 50).")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES),
+                        help="UI loading modes to time (default: both).")
+    parser.add_argument("--repeat", type=int, default=5, help="Launches per mode; the median is reported.")
+    parser.add_argument("--platform", default="offscreen", help="QT_QPA_PLATFORM unless already set.")
+    parser.add_argument("--out", type=Path, help="Also write the JSON results to this file.")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed slowdown per phase before --compare fails (default: 0.15).")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.prepare:
+        return child_prepare(args.rules)
+    if args.child:
+        return child_run(float(args.child))
+
+    from benchmarks.sort_bench import git_revision     # not in the children: it imports the sort core
+
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", args.platform)
+    prepared = run_child(["--prepare", "--rules", str(args.rules)], env)
+    if not prepared["compiled"]:
+        print("pyside6-uic not found: 'compiled' falls back to QUiLoader", file=sys.stderr)
+
+    params = {k: v for k, v in vars(args).items() if k not in ("out", "compare", "child", "prepare")}
+    report = {"revision": git_revision(), "python": sys.version.split()[0], "params": params,
+              "results": {mode: run_mode(mode, args) for mode in args.modes}}
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        args.out.write_text(text, encoding="utf-8")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
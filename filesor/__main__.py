@@ -0,0 +1,6 @@
+# Allows `python -m filesor ...` from the project root; see src/core/cli.py.
+import sys
+
+from src.core.cli import main
+
+sys.exit(main())
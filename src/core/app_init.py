@@ -6,34 +6,38 @@
 #   based on allowed file extensions.
 #   The interface is designed in Qt Designer (.ui file) and loaded dynamically at runtime.
 
+import os
 import sys
 
+from src.fs_ui.single_instance import InstanceServer
 from src.fs_ui.ui_handler import UIHandler
+from src.fs_ui.ui_loader import load_ui
 from src.fs_utils.app_utils import Helper
 from src.core.file_logic import FileLogic
 
-from PySide6.QtCore import QFile, QIODevice
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication, QMainWindow, QPushButton, QListView, QLabel
-from PySide6.QtUiTools import QUiLoader
-from PySide6.QtGui import QGuiApplication, QCloseEvent, QIcon
+from PySide6.QtGui import QCloseEvent, QIcon
 
 # Path to the Qt Designer .ui file
 MAIN_WINDOW_UI = Helper.resource_path("src/fs_ui/FileSorterMain.ui")
 
+# FILESOR_UI_CACHE=0 always parses the .ui with QUiLoader instead of the cached pyside6-uic module
+USE_UI_CACHE = os.environ.get("FILESOR_UI_CACHE", "1") != "0"
+
 class FileSorterApp(QMainWindow):
     """
     Main window class for the File Sorter application.
-    Loads the UI directly from a .ui file, initializes all widgets,
-    and manages user interaction logic (drag/drop, sorting, etc.).
+    Loads the UI from the .ui file (precompiled when cached, see ui_loader),
+    initializes all widgets, and manages user interaction logic (drag/drop,
+    sorting, etc.). Rules are loaded once the window has been painted.
     """
     def __init__(self):
         super().__init__()
 
         # Load UI
-        f = QFile(str(MAIN_WINDOW_UI))
-        f.open(QIODevice.ReadOnly)
-        self.ui = QUiLoader().load(f, self)
-        f.close()
+        self.ui = load_ui(MAIN_WINDOW_UI, self, use_cache=USE_UI_CACHE)
+        self._painted = False
 
         self.setCentralWidget(self.ui)
         self.setWindowTitle("FileSor")
@@ -41,6 +45,18 @@ class FileSorterApp(QMainWindow):
 
         # Menu bar
         menubar = self.menuBar()
+        options_menu = menubar.addMenu("Options")
+        preview_action = options_menu.addAction("Preview Sort…")
+        undo_action = options_menu.addAction("Undo Last Sort")
+        subfolders_action = options_menu.addAction("Sort Subfolders")
+        subfolders_action.setCheckable(True)
+        sniff_action = options_menu.addAction("Detect File Types by Content")
+        sniff_action.setCheckable(True)
+        duplicates_action = options_menu.addAction("Skip Duplicate Files")
+        duplicates_action.setCheckable(True)
+        options_menu.addSeparator()
+        import_action = options_menu.addAction("Import Rules…")
+        export_action = options_menu.addAction("Export Rules…")
         file_menu = menubar.addMenu("Help")
         manual_button = file_menu.addAction("Manual")
         file_menu.addAction("Exit", self.close)
@@ -57,10 +73,25 @@ class FileSorterApp(QMainWindow):
         self.ui_handler = UIHandler(self, self.file_logic)
 
         manual_button.triggered.connect(self.ui_handler.on_manual_clicked)
+        subfolders_action.toggled.connect(self.ui_handler.on_recursive_toggled)
+        sniff_action.toggled.connect(self.ui_handler.on_sniff_toggled)
+        duplicates_action.toggled.connect(self.ui_handler.on_duplicates_toggled)
+        import_action.triggered.connect(self.ui_handler.on_import_rules_clicked)
+        export_action.triggered.connect(self.ui_handler.on_export_rules_clicked)
+        preview_action.triggered.connect(self.ui_handler.on_preview_clicked)
+        undo_action.triggered.connect(self.file_logic.undo_last_sort)
+
+    def paintEvent(self, event):
+        """After the first frame is on screen, finish the startup work that can wait."""
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            QTimer.singleShot(0, self.ui_handler.load_after_show)
 
     def closeEvent(self, event: QCloseEvent):
-        """Save folder rules before the window closes."""
-        self.ui_handler.save_folder_rules()
+        """Stop background sorting and close the rules store before the window closes."""
+        self.file_logic.shutdown()
+        self.ui_handler.close_rules_store()
         event.accept()  # explicitly allow close
         super().closeEvent(event)
 
@@ -68,8 +99,20 @@ class FileSorterApp(QMainWindow):
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setApplicationName("FileSor")
+    paths = app.arguments()[1:]
+
+    # Another FileSor is already open: give it the paths and exit right away.
+    # Otherwise start listening before the window is built, so launches made
+    # while it is starting are queued here instead of opening their own window
+    server = InstanceServer(app)
+    if not server.claim(paths):
+        sys.exit(0)
+
     icon_path = Helper.resource_path("Icons/fsfoldersicon.ico")
     app.setWindowIcon(QIcon(str(icon_path)))
     window = FileSorterApp()
+    server.pathsReceived.connect(window.ui_handler.on_paths_received)
+    if paths:
+        window.ui_handler.on_paths_received(paths)
     window.show()
     sys.exit(app.exec())
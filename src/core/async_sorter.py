@@ -0,0 +1,135 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional
+
+from src.core.rules_store import load_rules_from
+from src.core.sort_core import SortCore, SortJob
+
+
+class SortResult:
+    """What happened to one file of an asynchronous sort."""
+    __slots__ = ("source", "status", "target", "size")
+
+    def __init__(self, source: Path, status: str, target: Optional[Path], size: int):
+        self.source = source
+        self.status = status    # moved / skipped / duplicate / error / cancelled
+        self.target = target    # where it landed, for moved files
+        self.size = size
+
+    def __repr__(self):
+        return f"SortResult({str(self.source)!r}, {self.status!r}, {str(self.target) if self.target else None!r})"
+
+
+class AsyncSorter:
+    """
+    asyncio front end to SortCore for services that embed FileSor, e.g. an
+    upload ingester:
+
+        sorter = AsyncSorter.from_rules_file(Path("rules.db"))
+        totals = await sorter.sort_paths([upload_dir])
+        async for result in sorter.iter_sort(paths):
+            ...
+
+    Jobs are the same SortJobs the app runs, so rule matching, destination
+    templates and collision handling are identical. Like the app's job
+    queue, jobs run one at a time on a dedicated thread: two jobs moving
+    into the same folder at once could pick the same free name. Blocking
+    filesystem calls never run on the event loop; they go to a bounded
+    executor. At most `max_queued` sorts wait for their turn, so further
+    callers are suspended until earlier ones finish.
+    """
+    def __init__(self, core: SortCore, max_queued: int = 16, max_pending: int = 1000, io_workers: int = 4):
+        self.core = core
+        self.max_pending = max_pending      # per-file results buffered before the movers wait
+        self.max_queued = max_queued
+        self._slots: Optional[asyncio.Semaphore] = None     # created on the service's loop
+        self._jobs = ThreadPoolExecutor(max_workers=1, thread_name_prefix="filesor-async")
+        self._io = ThreadPoolExecutor(max_workers=max(1, io_workers), thread_name_prefix="filesor-async-io")
+
+    @classmethod
+    def from_rules_file(cls, path: Path, **kwargs) -> "AsyncSorter":
+        """Sorter for a rules JSON file or rules.db, as used by the app and the CLI."""
+        core = SortCore()
+        core.bind_folder_rules(load_rules_from(path) or [])
+        return cls(core, **kwargs)
+
+    def _make_job(self, paths: Iterable) -> SortJob:
+        """Runs on the io executor: telling folders from files stats every path."""
+        if not self.core.folder_rules:
+            raise ValueError("No folder rules to sort with")
+        paths = [Path(p) for p in paths]
+        return self.core.make_job(dirs=[p for p in paths if p.is_dir()],
+                                  files=[p for p in paths if p.is_file()])
+
+    async def _run(self, job: SortJob) -> dict:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_queued)
+        async with self._slots:
+            future = asyncio.get_running_loop().run_in_executor(self._jobs, job.run)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                job.cancel.set()    # files already being moved still finish
+                raise
+
+    async def sort_paths(self, paths: Iterable) -> dict:
+        """Sort files and folders as one job and return its totals (see MoveEngine.run)."""
+        loop = asyncio.get_running_loop()
+        job = await loop.run_in_executor(self._io, self._make_job, list(paths))
+        return await self._run(job)
+
+    async def iter_sort(self, paths: Iterable) -> AsyncIterator[SortResult]:
+        """
+        Sort `paths` as one job and yield a SortResult per file as it is
+        handled. At most max_pending results are buffered; when the consumer
+        falls behind, the movers wait for it instead of running ahead.
+        Leaving the loop early cancels the rest of the job. Files skipped
+        because an incremental scan index already knew them are not reported.
+        """
+        loop = asyncio.get_running_loop()
+        job = await loop.run_in_executor(self._io, self._make_job, list(paths))
+        results = asyncio.Queue(self.max_pending)
+        closed = [False]
+        finished = object()
+
+        def on_result(source: Path, status: str, target: Optional[Path], size: int):
+            # Worker thread: block until the loop accepted the result (backpressure)
+            if closed[0]:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(results.put(SortResult(source, status, target, size)),
+                                                 loop).result()
+            except Exception:
+                job.cancel.set()    # the loop is gone; stop moving files nobody hears about
+
+        job.on_result = on_result
+
+        async def run_job() -> dict:
+            try:
+                return await self._run(job)
+            finally:
+                await results.put(finished)
+
+        task = asyncio.ensure_future(run_job())
+        try:
+            while True:
+                item = await results.get()
+                if item is finished:
+                    break
+                yield item
+            await task      # re-raise a failed job
+        finally:
+            if not task.done():
+                closed[0] = True
+                job.cancel.set()
+                # Keep draining so no worker stays blocked on a full queue
+                while not task.done():
+                    while not results.empty():
+                        results.get_nowait()
+                    await asyncio.wait({task}, timeout=0.05)
+
+    def close(self) -> None:
+        """Release the executor threads when the service shuts down; a running job still finishes."""
+        self._jobs.shutdown(wait=False)
+        self._io.shutdown(wait=False)
@@ -0,0 +1,270 @@
+# cli.py
+# Description:
+#   Headless entry point for cron jobs and servers: sorts folders with the
+#   same rules file the GUI writes, without importing PySide6.
+#
+#   python -m filesor sort <dir> [<dir> ...] --rules folder_rules.json --workers 8 --json-report
+#   python -m filesor watch <dir> --rules folder_rules.json
+#   python -m filesor runs | resume [RUN] | undo [RUN]
+
+import argparse
+import contextlib
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from src.core import rules_io
+from src.core.dedupe import Deduplicator, hash_index_for
+from src.core.fs_ops import COPY_CHUNK, LARGE_FILE, VERIFY_MODES, CopyOptions
+from src.core.journal import journal_dir_for, list_runs
+from src.core.metrics import dump_metrics
+from src.core.rule_engine import parse_size
+from src.core.rules_store import load_rules_from
+from src.core.scan_index import scan_index_for
+from src.core.scanner import ScanOptions
+from src.core.sniffer import ContentSniffer, sniff_cache_for
+from src.core.sort_core import SortCore
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="filesor", description="Sort files into folders by extension rules.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sort_cmd = commands.add_parser("sort", help="Sort files and/or folders using a rules file.")
+    sort_cmd.add_argument("paths", nargs="+", type=Path, help="Folders to sort and/or individual files.")
+    sort_cmd.add_argument("--rules", type=Path, default=None,
+                          help=f"Rules JSON or rules.db (default: the app's rules in "
+                               f"{rules_io.default_rules_path().parent}).")
+    sort_cmd.add_argument("--workers", type=int, default=4, help="Parallel moves per drive (default: 4).")
+    sort_cmd.add_argument("--device-limit", action="append", default=[], metavar="PATH=N",
+                          help="Parallel moves on the drive holding PATH, e.g. /mnt/usb=1; may be repeated.")
+    sort_cmd.add_argument("--recursive", action="store_true", help="Also sort files in subfolders.")
+    sort_cmd.add_argument("--max-depth", type=int, default=None, help="Deepest subfolder level with --recursive.")
+    sort_cmd.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                          help="Skip matching files/folders; may be repeated.")
+    sort_cmd.add_argument("--fsync", action="store_true", help="fsync cross-device copies before deleting sources.")
+    _add_copy_arguments(sort_cmd)
+    sort_cmd.add_argument("--sniff", choices=ContentSniffer.MODES, default=None,
+                          help="Also classify files by content: 'unmatched' files only, or 'all' "
+                               "(re-routes files with a wrong extension).")
+    sort_cmd.add_argument("--duplicates", choices=Deduplicator.ACTIONS, default=None,
+                          help="Detect files already present in the destination and 'skip' them "
+                               "or replace them with a hard 'link' to the existing copy.")
+    sort_cmd.add_argument("--incremental", action="store_true",
+                          help="Skip folders and unmatched files that have not changed since the last run.")
+    sort_cmd.add_argument("--dry-run", action="store_true", help="Only plan the sort and report what it would do.")
+    sort_cmd.add_argument("--metrics-out", type=Path, default=None,
+                          help="Write run metrics to this file (.prom = Prometheus text, else JSON).")
+    sort_cmd.add_argument("--no-journal", action="store_true", help="Do not journal moves (no resume/undo).")
+    sort_cmd.add_argument("--json-report", action="store_true", help="Print the run totals as JSON.")
+
+    watch_cmd = commands.add_parser("watch", help="Keep sorting files as they arrive in a folder.")
+    watch_cmd.add_argument("folder", type=Path, help="Folder to watch.")
+    watch_cmd.add_argument("--rules", type=Path, default=None, help="Rules JSON or rules.db (default: the app's rules).")
+    watch_cmd.add_argument("--workers", type=int, default=4, help="Parallel moves per drive (default: 4).")
+    watch_cmd.add_argument("--device-limit", action="append", default=[], metavar="PATH=N",
+                           help="Parallel moves on the drive holding PATH; may be repeated.")
+    watch_cmd.add_argument("--settle", type=float, default=2.0,
+                           help="Seconds a file's size/mtime must stay unchanged before it is moved.")
+    watch_cmd.add_argument("--interval", type=float, default=1.0, help="Polling interval in seconds.")
+    watch_cmd.add_argument("--batch-size", type=int, default=500, help="Most files moved per batch.")
+    watch_cmd.add_argument("--poll", action="store_true", help="Always poll instead of using inotify.")
+    watch_cmd.add_argument("--sort-existing", action="store_true", help="Also sort files present at startup.")
+    watch_cmd.add_argument("--recursive", action="store_true", help="Also watch subfolders (polling only).")
+    watch_cmd.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                           help="Skip matching files/folders; may be repeated.")
+    watch_cmd.add_argument("--sniff", choices=ContentSniffer.MODES, default=None,
+                           help="Also classify files by content ('unmatched' or 'all').")
+    watch_cmd.add_argument("--duplicates", choices=Deduplicator.ACTIONS, default=None,
+                           help="Skip or hard-link files already present in the destination.")
+    _add_copy_arguments(watch_cmd)
+    watch_cmd.add_argument("--json-report", action="store_true", help="Print per-batch stats as JSON lines.")
+
+    for name, help_text in (("runs", "List journaled sort runs."),
+                            ("resume", "Finish an interrupted sort run."),
+                            ("undo", "Move the files of a sort run back.")):
+        cmd = commands.add_parser(name, help=help_text)
+        if name != "runs":
+            cmd.add_argument("run", nargs="?", default="latest",
+                             help="Run id (journal file name) or 'latest' (default).")
+        cmd.add_argument("--rules", type=Path, default=None, help="Rules JSON whose folder holds the journals.")
+        cmd.add_argument("--workers", type=int, default=4, help="Parallel move workers (default: 4).")
+        cmd.add_argument("--json-report", action="store_true", help="Print results as JSON.")
+    return parser
+
+
+def _add_copy_arguments(cmd) -> None:
+    cmd.add_argument("--copy-chunk", default=None, metavar="SIZE",
+                     help=f"Bytes per copy step across drives, e.g. 8M (default: {COPY_CHUNK // 1024 ** 2}M).")
+    cmd.add_argument("--large-file", default=None, metavar="SIZE",
+                     help=f"Copy files from this size on in their own lane (default: {LARGE_FILE // 1024 ** 2}M).")
+    cmd.add_argument("--verify", choices=VERIFY_MODES, default="size",
+                     help="Check copies before deleting the source: 'size' (default) or full 'hash'.")
+
+
+def _copy_options(args) -> CopyOptions:
+    try:
+        return CopyOptions(chunk=parse_size(args.copy_chunk) if args.copy_chunk else COPY_CHUNK,
+                           verify=args.verify,
+                           large_file=parse_size(args.large_file) if args.large_file else LARGE_FILE)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+
+def _journal_dir(args) -> Path:
+    return journal_dir_for(args.rules or rules_io.default_rules_path())
+
+
+def _print_totals(args, totals: dict, labels=("Sorted", "No extension matched")) -> None:
+    if args.json_report:
+        print(json.dumps(totals))
+        return
+    print(f"{labels[0]}: {totals['moved']}\n{labels[1]}: {totals['skipped']}\nErrors: {totals['errors']}")
+    if totals.get("duplicates"):
+        print(f"Already in destination: {totals['duplicates']}")
+    metrics = totals.get("metrics")
+    if metrics:
+        print(f"Time: {metrics['elapsed_s']}s ({metrics['files_per_s']} files/s, "
+              f"{metrics['bytes_per_s'] / 1024 / 1024:.1f} MB/s)")
+        for category, count in metrics["errors"].items():
+            print(f"  {category}: {count}")
+        for sample in metrics.get("error_samples", []):
+            print(f"  {sample}")
+
+
+def _parse_device_limits(values: List[str]) -> dict:
+    """['/mnt/usb=1', '/data=8'] -> {'/mnt/usb': 1, '/data': 8}."""
+    limits = {}
+    for value in values:
+        path, sep, limit = value.rpartition("=")
+        if not sep or not path or not limit.isdigit() or int(limit) < 1:
+            raise SystemExit(f"Invalid --device-limit {value!r}: expected PATH=N with N >= 1")
+        limits[path] = int(limit)
+    return limits
+
+
+def _load_core(args) -> Optional[SortCore]:
+    """Build a SortCore from the rules file named on the command line."""
+    rules_path = args.rules or rules_io.default_rules_path()
+    rules = load_rules_from(rules_path)
+    if not rules:
+        print(f"No folder rules found in {rules_path}", file=sys.stderr)
+        return None
+
+    core = SortCore()
+    core.bind_folder_rules(rules)
+    core.move_workers = args.workers
+    core.device_limits = _parse_device_limits(getattr(args, "device_limit", []))
+    if hasattr(args, "verify"):
+        core.copy_options = _copy_options(args)
+    if getattr(args, "sniff", None):
+        core.content_sniffer = ContentSniffer(sniff_cache_for(rules_path), args.sniff)
+    if getattr(args, "duplicates", None):
+        core.deduplicator = Deduplicator(hash_index_for(rules_path), args.duplicates)
+    return core
+
+
+def run_sort(args) -> int:
+    core = _load_core(args)
+    if core is None:
+        return 2
+    core.fsync_copies = args.fsync
+    core.scan_options = ScanOptions(args.recursive, args.max_depth, args.exclude)
+    if not args.no_journal and not args.dry_run:
+        core.journal_dir = _journal_dir(args)
+    if args.incremental:
+        core.scan_index_path = scan_index_for(args.rules or rules_io.default_rules_path())
+
+    dirs = [p for p in args.paths if p.is_dir()]
+    files = [p for p in args.paths if not p.is_dir()]
+
+    started = time.perf_counter()
+    # Keep stdout machine-readable: per-file error messages go to stderr
+    with contextlib.redirect_stdout(sys.stderr if args.json_report else sys.stdout):
+        totals = core.make_job(dirs=dirs, files=files, dry_run=args.dry_run).run()
+    totals["elapsed"] = round(time.perf_counter() - started, 3)
+    totals.pop("plan", None)
+    if args.metrics_out and "metrics" in totals:
+        dump_metrics(totals["metrics"], args.metrics_out)
+
+    if args.dry_run and not args.json_report:
+        print(f"Would sort: {totals['files']} ({totals['bytes']} bytes; {totals['renames']} renames, "
+              f"{totals['copies']} copies)\nNo extension matched: {totals['skipped']}\nErrors: {totals['errors']}")
+        for path, stats in totals["per_rule"].items():
+            print(f"  {stats['name'] or path}: {stats['files']}")
+    else:
+        _print_totals(args, totals)
+    return 1 if totals["errors"] else 0
+
+
+def run_watch(args) -> int:
+    # Imported here so `sort` never pays for ctypes/select
+    from src.core.watcher import FolderWatcher
+
+    core = _load_core(args)
+    if core is None:
+        return 2
+    core.scan_options = ScanOptions(args.recursive, None, args.exclude)
+
+    def report(stats: dict):
+        if args.json_report:
+            print(json.dumps(stats), flush=True)
+        else:
+            print(f"moved {stats['moved']}, skipped {stats['skipped']}, errors {stats['errors']}, "
+                  f"queue {stats['queue_depth']}, latency {stats['last_latency']}s", flush=True)
+
+    watcher = FolderWatcher(core, args.folder, settle=args.settle, poll_interval=args.interval,
+                            batch_size=args.batch_size, use_inotify=not args.poll,
+                            sort_existing=args.sort_existing, on_batch=report)
+    try:
+        watcher.run(threading.Event())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run_journal_command(args) -> int:
+    core = SortCore()
+    core.journal_dir = _journal_dir(args)
+    core.move_workers = args.workers
+
+    if args.command == "runs":
+        for path, info in list_runs(core.journal_dir):
+            sources = ", ".join(info["header"].get("dirs", []) + info["header"].get("files", [])[:3])
+            print(f"{path.stem}  {info['status']:<16} {info['moves']:>8} moved  {sources}")
+        return 0
+
+    if args.run == "latest":
+        path = core.find_interrupted_run() if args.command == "resume" else core.find_undoable_run()
+    else:
+        path = core.journal_dir / f"{args.run}.jsonl"
+    if path is None or not path.exists():
+        print(f"No matching run in {core.journal_dir}", file=sys.stderr)
+        return 2
+
+    job = core.make_resume_job(path) if args.command == "resume" else core.make_undo_job(path)
+    with contextlib.redirect_stdout(sys.stderr if args.json_report else sys.stdout):
+        totals = job.run()
+    if args.command == "undo":
+        _print_totals(args, totals, ("Restored", "Missing or replaced"))
+    else:
+        _print_totals(args, totals)
+    return 1 if totals["errors"] else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "sort":
+        return run_sort(args)
+    if args.command == "watch":
+        return run_watch(args)
+    if args.command in ("runs", "resume", "undo"):
+        return run_journal_command(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
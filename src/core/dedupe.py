@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+HASH_INDEX_FILENAME = "hash_index.json"     # Created next to folder_rules.json
+EDGE_BLOCK = 64 * 1024                      # Bytes hashed from each end for the partial hash
+HASH_CHUNK = 1024 * 1024
+MAX_INDEX_ENTRIES = 500000
+
+
+def hash_index_for(rules_path: Path) -> Path:
+    """Where the destination hash index lives for a given rules file."""
+    return rules_path.parent / HASH_INDEX_FILENAME
+
+
+def partial_hash(path: Path, size: int) -> str:
+    """BLAKE2b of the first and last EDGE_BLOCK bytes (the whole file if it is small)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(EDGE_BLOCK))
+        if size > 2 * EDGE_BLOCK:
+            f.seek(size - EDGE_BLOCK)
+        h.update(f.read(EDGE_BLOCK))
+    return h.hexdigest()
+
+
+def full_hash(path: Path) -> str:
+    """Streaming BLAKE2b of the whole file."""
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Deduplicator:
+    """
+    Finds files that already exist, byte for byte, in a destination folder.
+    Candidates are narrowed in stages: same size, then a hash of the first
+    and last blocks, then a full streaming hash only when those tie.
+    Hashes are kept in a persistent index keyed by path and validated
+    against (size, mtime, inode), so a destination file is hashed at most
+    once across runs. `action` decides what happens to a duplicate source:
+    'skip' leaves it where it is, 'link' removes it and hard-links its
+    target name to the existing copy (same filesystem only, else skipped).
+    Thread-safe.
+    """
+    ACTIONS = ("skip", "link")
+
+    def __init__(self, cache_path: Optional[Path] = None, action: str = "skip"):
+        if action not in self.ACTIONS:
+            raise ValueError(f"Unknown duplicate action: {action}")
+        self.cache_path = cache_path
+        self.action = action
+        self._lock = threading.Lock()
+        self._index = None          # str(path) -> [size, mtime_ns, inode, partial, full]
+        self._dirty = False
+        self._by_size = {}          # destination folder -> {size: [paths]}, per run
+
+    def start_run(self) -> None:
+        """Forget folder listings from a previous run; the hash index is kept."""
+        with self._lock:
+            self._by_size = {}
+
+    def _entries(self) -> dict:
+        if self._index is None:
+            index = {}
+            if self.cache_path is not None and self.cache_path.is_file():
+                try:
+                    with open(self.cache_path, encoding="utf-8") as f:
+                        index = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Ignoring unreadable hash index {self.cache_path}: {e}")
+            self._index = index
+        return self._index
+
+    def _sizes_in(self, dest_dir: Path) -> dict:
+        """{size: [paths]} of the files in `dest_dir`, listed once per run."""
+        with self._lock:
+            sizes = self._by_size.get(dest_dir)
+        if sizes is not None:
+            return sizes
+        sizes = {}
+        try:
+            with os.scandir(dest_dir) as it:
+                for entry in it:
+                    if entry.is_file(follow_symlinks=False):
+                        sizes.setdefault(entry.stat().st_size, []).append(Path(entry.path))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            return self._by_size.setdefault(dest_dir, sizes)
+
+    def _hash(self, path: Path, st: os.stat_result, full: bool) -> str:
+        key = str(path)
+        stamp = [st.st_size, st.st_mtime_ns, st.st_ino]
+        with self._lock:
+            record = list(self._entries().get(key) or [])
+        if record[:3] != stamp:
+            record = stamp + [partial_hash(path, st.st_size), ""]
+        elif (record[4] or not full) and record[3]:
+            return record[4] if full else record[3]
+
+        if full:
+            # Small files are read whole by partial_hash already
+            record[4] = record[3] if st.st_size <= 2 * EDGE_BLOCK else full_hash(path)
+        with self._lock:
+            index = self._entries()
+            if key not in index and len(index) >= MAX_INDEX_ENTRIES:
+                del index[next(iter(index))]    # oldest entry
+            index[key] = record
+            self._dirty = True
+        return record[4] if full else record[3]
+
+    def find_duplicate(self, source: Path, st: os.stat_result, dest_dir: Path) -> Optional[Path]:
+        """An existing file in `dest_dir` with the same content as `source`, or None."""
+        candidates = self._sizes_in(dest_dir).get(st.st_size)
+        if not candidates:
+            return None
+        source_partial = None
+        for candidate in list(candidates):
+            try:
+                cst = os.stat(candidate)
+                if cst.st_size != st.st_size or (cst.st_ino == st.st_ino and cst.st_dev == st.st_dev):
+                    continue
+                if source_partial is None:
+                    source_partial = self._hash(source, st, full=False)
+                if self._hash(candidate, cst, full=False) != source_partial:
+                    continue
+                if self._hash(candidate, cst, full=True) == self._hash(source, st, full=True):
+                    return candidate
+            except OSError as e:
+                print(f"Cannot compare {source} with {candidate}: {e}")
+        return None
+
+    def landed(self, source: Path, target: Path, st: os.stat_result) -> None:
+        """Record a file that was moved into a destination during this run."""
+        with self._lock:
+            sizes = self._by_size.get(target.parent)
+            if sizes is not None:
+                sizes.setdefault(st.st_size, []).append(target)
+            index = self._entries()
+            record = index.pop(str(source), None)
+            if record is not None:
+                index[str(target)] = record     # a rename keeps size, mtime and inode
+                self._dirty = True
+
+    def save(self) -> None:
+        """Write the hash index back if it changed (atomic replace)."""
+        with self._lock:
+            if not self._dirty or self.cache_path is None:
+                return
+            data = json.dumps(self._index)
+            self._dirty = False
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(".tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"Could not save hash index {self.cache_path}: {e}")
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import re
+import string
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+# Fields a rule's "template" may use; the ones in STAT_FIELDS need the file's stat
+TEMPLATE_FIELDS = ("path", "rule", "ext", "mtime", "size", "shard")
+STAT_FIELDS = ("mtime", "size")
+
+SIZE_BUCKETS = ((1024 ** 2, "under-1MB"), (100 * 1024 ** 2, "1MB-100MB"), (1024 ** 3, "100MB-1GB"))
+
+
+class _Shard:
+    """'{shard}' / '{shard:3}': leading hex digits of a hash of the file name."""
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __format__(self, spec: str) -> str:
+        width = int(spec) if spec else 2
+        return hashlib.md5(os.path.normcase(self.name).encode("utf-8", "surrogateescape")).hexdigest()[:width]
+
+
+class _Time(datetime):
+    """'{mtime}' alone formats as a date instead of datetime's str()."""
+    def __format__(self, spec: str) -> str:
+        return self.strftime(spec or "%Y-%m-%d")
+
+
+def size_bucket(size: int) -> str:
+    for limit, label in SIZE_BUCKETS:
+        if size < limit:
+            return label
+    return "over-1GB"
+
+
+class DestinationTemplate:
+    """
+    A rule's "template": subfolders below the rule's folder built per file,
+    e.g. '{mtime:%Y}/{mtime:%m}' or '{ext}/{shard}'.
+    Templates are always placed under the rule's path; '{path}' may be
+    used to spell that out, as the whole template or followed by a
+    separator. Absolute templates are rejected. Fields:
+        {path}  the rule folder          {rule}  the rule name
+        {ext}   extension without dot    {shard} / {shard:N}  hash prefix of the name
+        {mtime:<strftime>}  modification time, e.g. {mtime:%Y-%m}
+        {size}  size bucket (under-1MB, 1MB-100MB, 100MB-1GB, over-1GB)
+    """
+    def __init__(self, text: str):
+        self.text = text
+        fields = set()
+        path_fields = 0
+        for _, field, spec, conversion in string.Formatter().parse(text):
+            if field is None:
+                continue
+            if field == "path":
+                path_fields += 1
+            if field not in TEMPLATE_FIELDS:
+                raise ValueError(f"Unknown template field {{{field}}}")
+            if conversion:
+                raise ValueError(f"Conversions are not supported: {{{field}!{conversion}}}")
+            if field == "shard" and spec and not spec.isdigit():
+                raise ValueError(f"{{shard:{spec}}} needs a number of hex digits, e.g. {{shard:2}}")
+            if field == "mtime" and re.search(r"[\\/]", spec):
+                raise ValueError(f"{{mtime:{spec}}}: put '/' between fields, not inside the date format")
+            if field == "mtime" and spec and not spec.strip("."):
+                raise ValueError(f"{{mtime:{spec}}} is not a date format, e.g. {{mtime:%Y-%m}}")
+            fields.add(field)
+        self.fields = fields
+        self.needs_stat = bool(fields & set(STAT_FIELDS))
+        if ".." in re.split(r"[\\/]", text):
+            raise ValueError("Templates cannot leave the rule folder ('..')")
+        if text.startswith(("/", "\\")) or re.match(r"[A-Za-z]:", text) or Path(text).is_absolute():
+            raise ValueError("Templates are placed under the rule folder and cannot be absolute paths")
+        if path_fields and (path_fields > 1 or not re.match(r"\{path\}([\\/]|$)", text)):
+            raise ValueError("{path} can only start the template, followed by '/' or nothing, e.g. {path}/{ext}")
+        self._relative = not path_fields
+
+    def resolve(self, rule: dict, entry: Path, st: Optional[os.stat_result] = None) -> Path:
+        """Destination folder for `entry` under `rule`; `st` is required if needs_stat."""
+        values = {}
+        fields = self.fields
+        if "path" in fields:
+            values["path"] = rule['path']
+        if "rule" in fields:
+            values["rule"] = _clean(rule.get('name', '')) or "rule"
+        if "ext" in fields:
+            values["ext"] = _clean(entry.suffix.lstrip(".").lower()) or "noext"
+        if "shard" in fields:
+            values["shard"] = _Shard(entry.name)
+        if "mtime" in fields:
+            values["mtime"] = _Time.fromtimestamp(st.st_mtime)
+        if "size" in fields:
+            values["size"] = size_bucket(st.st_size)
+        folder = self.text.format(**values)
+        # Field values can still form path parts the raw text did not show
+        base = str(rule['path'])
+        below = folder if self._relative else folder[len(base):]
+        if (self._relative and (below.startswith(("/", "\\")) or re.match(r"[A-Za-z]:", below))) \
+                or ".." in re.split(r"[\\/]", below):
+            raise ValueError(f"Template {self.text!r} leaves the rule folder: {folder!r}")
+        target = Path(base) / below if self._relative else Path(folder)
+        if os.path.commonpath([os.path.normpath(base), os.path.normpath(target)]) != os.path.normpath(base):
+            raise ValueError(f"Template {self.text!r} leaves the rule folder: {folder!r}")
+        return target
+
+
+def _clean(value: str) -> str:
+    """Keep field values from adding path levels of their own."""
+    return value.replace("/", "_").replace("\\", "_").strip(". ")
+
+
+@lru_cache(maxsize=256)
+def compile_template(text: str) -> DestinationTemplate:
+    return DestinationTemplate(text)
+
+
+def validate_template(text: str) -> str:
+    """Return the template if it is valid, else raise ValueError."""
+    compile_template(text)
+    return text
+
+
+def destination_for(rule: dict, entry: Path) -> tuple:
+    """
+    (folder, stat) for `entry` under `rule`. The stat is only taken when
+    the rule's template needs it, and returned so callers can reuse it;
+    rules without a template resolve to their fixed path with no syscall.
+    Raises ValueError if the resolved folder would leave the rule folder.
+    """
+    template = rule.get('template')
+    if not template:
+        return Path(rule['path']), None
+    compiled = compile_template(template)
+    st = None
+    if compiled.needs_stat:
+        try:
+            st = entry.stat()
+        except OSError:
+            return Path(rule['path']), None     # the move will report the error
+    return compiled.resolve(rule, entry, st), st
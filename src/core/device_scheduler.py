@@ -0,0 +1,168 @@
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+SLOW_DEVICE_LIMIT = 2           # spinning disks and removable drives
+LARGE_LIMIT = 1                 # large-file copies per device, on top of its normal limit
+MAX_THREADS = 64                # hard cap on movers across all devices
+QUEUE_DEPTH = 8                 # queued tasks per running slot before the producer waits
+
+
+def device_of(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+
+def default_device_limit(dev: int, fallback: int) -> int:
+    """
+    Concurrency that suits a device: SLOW_DEVICE_LIMIT for rotational and
+    removable block devices (detected through /sys on Linux), else `fallback`.
+    """
+    if not sys.platform.startswith("linux"):
+        return fallback
+    block = Path(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}")
+    try:
+        block = block.resolve()
+        # Partitions have no queue/ of their own; the whole disk is the parent
+        disk = block if (block / "queue").is_dir() else block.parent
+        if (disk / "queue" / "rotational").read_text().strip() == "1":
+            return SLOW_DEVICE_LIMIT
+        if (disk / "removable").read_text().strip() == "1":
+            return SLOW_DEVICE_LIMIT
+    except OSError:
+        pass        # not a block device (tmpfs, network, overlay): use the fallback
+    return fallback
+
+
+class DeviceScheduler:
+    """
+    Runs move tasks under per-device concurrency limits.
+    Every task names the devices it touches (source and destination st_dev;
+    one device for a rename). It starts only while each of them is below
+    its limit, so a slow USB disk gets a couple of movers while SSDs next to
+    it keep their full count, and the thread count grows with the number
+    of devices instead of one global worker setting.
+    Tasks are queued per device combination and started round-robin across
+    the queues, so one busy device never starves the others; within a queue
+    they run in submission order.
+    `limits` maps st_dev to a limit; other devices get limit_for(dev).
+    Large-file copies use the keys ("large", st_dev): a separate slot pool
+    of `large_limit` per device, so they never hold up the small files.
+    """
+    def __init__(self, default_limit: int = 4, limits: Optional[Dict[int, int]] = None,
+                 limit_for: Optional[Callable[[int, int], int]] = default_device_limit,
+                 max_threads: int = MAX_THREADS, thread_name_prefix: str = "filesor-move",
+                 large_limit: int = LARGE_LIMIT):
+        self.default_limit = max(1, int(default_limit))
+        self.large_limit = max(1, int(large_limit))
+        self._limits = dict(limits or {})
+        self._limit_for = limit_for
+        self.max_threads = max(1, max_threads)
+        self._prefix = thread_name_prefix
+        self._cond = threading.Condition()
+        self._queues: Dict[Tuple, deque] = {}   # devices -> pending (future, fn, args)
+        self._order = deque()                   # round-robin order of non-empty queues
+        self._active: Dict[int, int] = {}       # device -> running tasks
+        self._threads = []
+        self._idle = 0
+        self._shutdown = False
+
+    def limit(self, dev) -> int:
+        if isinstance(dev, tuple):
+            return self.large_limit
+        if dev is None:
+            return self.default_limit
+        limit = self._limits.get(dev)
+        if limit is None:
+            limit = self._limits[dev] = (self._limit_for(dev, self.default_limit) if self._limit_for
+                                         else self.default_limit)
+        return max(1, limit)
+
+    def submit(self, devices: Tuple, fn: Callable, *args) -> Future:
+        """
+        Queue fn(*args) for the given devices and return its Future.
+        Blocks while that device combination already has QUEUE_DEPTH tasks
+        per slot waiting, which bounds memory without stalling other devices.
+        """
+        devices = tuple(sorted(set(devices), key=str))
+        depth = QUEUE_DEPTH * min(self.limit(d) for d in devices)
+        future = Future()
+        with self._cond:
+            queue = self._queues.get(devices)
+            if queue is None:
+                queue = self._queues[devices] = deque()
+            while len(queue) >= depth and not self._shutdown:
+                self._cond.wait()
+            if self._shutdown:
+                raise RuntimeError("scheduler is shut down")
+            if not queue:
+                self._order.append(devices)
+            queue.append((future, fn, args))
+            want = sum(self.limit(d) for d in self._active.keys() | set(devices))
+            if self._idle == 0 and len(self._threads) < min(self.max_threads, want):
+                thread = threading.Thread(target=self._worker, name=f"{self._prefix}-{len(self._threads)}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify_all()
+        return future
+
+    def _next_task(self):
+        """First runnable queue in round-robin order; caller holds the lock."""
+        for _ in range(len(self._order)):
+            devices = self._order[0]
+            self._order.rotate(-1)
+            if all(self._active.get(d, 0) < self.limit(d) for d in devices):
+                queue = self._queues[devices]
+                task = queue.popleft()
+                if not queue:
+                    self._order.remove(devices)
+                for d in devices:
+                    self._active[d] = self._active.get(d, 0) + 1
+                return devices, task
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                picked = self._next_task()
+                while picked is None:
+                    if self._shutdown and not self._order:
+                        return
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                    picked = self._next_task()
+                self._cond.notify_all()     # a queue slot opened for a waiting producer
+            devices, (future, fn, args) = picked
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._cond:
+                for d in devices:
+                    self._active[d] -= 1
+                self._cond.notify_all()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Run what is queued, then stop the worker threads."""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        return False
@@ -1,71 +1,27 @@
-import shutil
 from pathlib import Path
 from typing import List, Optional
 
-from PySide6.QtWidgets import QFileDialog, QMessageBox
+from src.core.sort_core import SortCore
+from src.core.sort_jobs import InterruptedRunScan, SortJobQueue
+from src.fs_utils.app_utils import Helper
 
-class FileLogic:
+class FileLogic(SortCore):
+    """
+    SortCore for the main window. Dialogs (and the journal helpers) are
+    imported where they are shown, so building the window does not load them.
+    """
     def __init__(self, window):
+        super().__init__()
 
         self.window = window
-        self.folder_rules: Optional[list] = None    # Will be set by UIHandler
-
-    def bind_folder_rules(self, folder_rules: list) -> None:
-        """
-        Bind FileLogic to the UI's folder_rules list.
-        Both will now reference the SAME list object.
-        """
-        self.folder_rules = folder_rules
-
-    @staticmethod
-    def resolve_name_collision(dest_dir: Path, filename: str) -> Path:
-        """
-        Ensure unique filenames when moving files.
-        Example: 'file.txt' -> 'file (1).txt' if the name already exists.
-        """
-        candidate = dest_dir / filename
-        if not candidate.exists():
-            return candidate
-
-        stem = Path(filename).stem
-        suffix = Path(filename).suffix
-        i = 1
-        while True:
-            candidate = dest_dir / f"{stem} ({i}){suffix}"
-            if not candidate.exists():
-                return candidate
-            i += 1
-
-    def find_target_for_extension(self, ext: str):
-        """Find the first folder rule that matches a given file extension."""
-        if not self.folder_rules:
-            return None
-
-        ext = (ext or "").lower()
-        if not ext.startswith('.'):
-            ext = '.' + ext if ext else ''
-        for rule in self.folder_rules:
-            if ext in rule['exts']:
-                return rule
-        return None
-
-    def _move_one_file(self, entry: Path) -> str:
-        """Move a single file to its destination folder based on extension rules."""
-        try:
-            rule = self.find_target_for_extension(entry.suffix)
-            if not rule:
-                return "skipped"
-            dest_dir = Path(rule['path'])
-            dest_dir.mkdir(parents=True, exist_ok=True)
-            target = FileLogic.resolve_name_collision(dest_dir, entry.name)
-            shutil.move(str(entry), str(target))
-            return "moved"
-        except Exception as e:
-            print(f"Error moving {entry}: {e}")
-            return "error"
+        self.jobs = SortJobQueue(window)            # Runs sorts off the GUI thread
+        self.jobs.jobFinished.connect(self.show_summary)
+        self._run_scan: Optional[InterruptedRunScan] = None
 
     def sort_files(self):
         """Prompt user to select a folder and sort its contents."""
+        from PySide6.QtWidgets import QFileDialog
+
         source_dir = QFileDialog.getExistingDirectory(None, "Select Source Folder to Sort")
         if not source_dir:
             return
@@ -74,23 +30,125 @@ class FileLogic:
     def sort_files_from_directory(self, source: Path):
         """Sort all files within a selected directory based on folder rules."""
         if not self.folder_rules:
+            from PySide6.QtWidgets import QMessageBox
             QMessageBox.information(None, "No Rules", "Add at least one folder with allowed extensions first.")
             return
-        moved = skipped = errors = 0
-        for entry in source.iterdir():
-            if not entry.is_file():
-                continue
-            result = self._move_one_file(entry)
-            if result == "moved":
-                moved += 1
-            elif result == "skipped":
-                skipped += 1
-            else:
-                errors += 1
+        self.submit_job(dirs=[source])
+
+    def sort_individual_files(self, files: List[Path]):
+        """Sort a list of individual files dropped or manually selected by the user."""
+        if not self.folder_rules:
+            from PySide6.QtWidgets import QMessageBox
+            QMessageBox.information(self.window, "No Rules", "Add at least one folder with allowed extensions first.")
+            return
+        self.submit_job(files=files)
+
+    def sort_paths(self, paths: List[Path]):
+        """
+        Sort any mix of dropped or selected files and folders as one job:
+        overlapping sources are merged, the folders are scanned together
+        and a single summary is shown at the end.
+        """
+        dirs = [p for p in paths if p.is_dir()]
+        files = [p for p in paths if p.is_file()]
+        if not dirs and not files:
+            return
+        if not self.folder_rules:
+            from PySide6.QtWidgets import QMessageBox
+            QMessageBox.information(self.window, "No Rules", "Add at least one folder with allowed extensions first.")
+            return
+        self.submit_job(dirs=dirs, files=files)
+
+    def preview_directory(self, source: Path):
+        """Plan a sort of `source` in the background and show what it would do."""
+        if not self.folder_rules:
+            from PySide6.QtWidgets import QMessageBox
+            QMessageBox.information(self.window, "No Rules", "Add at least one folder with allowed extensions first.")
+            return
+        self.jobs.submit(self.make_job(dirs=[source], dry_run=True))
+
+    def offer_resume(self) -> None:
+        """If a journaled run was interrupted (crash/reboot), offer to finish it."""
+        if self._run_scan is not None:
+            return
+        # Reading the journals can take a while; the answer comes back through a signal
+        self._run_scan = InterruptedRunScan(self, self.window)
+        self._run_scan.found.connect(self._on_interrupted_run)
+        self._run_scan.start()
+
+    def _on_interrupted_run(self, path: Optional[Path]) -> None:
+        if path is None:
+            return
+        from PySide6.QtWidgets import QMessageBox
+        from src.core.journal import mark_run
+
+        reply = QMessageBox.question(
+            self.window, "Resume Sorting",
+            "A previous sort was interrupted before it finished.\nResume it now?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.jobs.submit(self.make_resume_job(path))
+        else:
+            mark_run(path, "abandoned")
+
+    def undo_last_sort(self) -> None:
+        """Move the files of the most recent journaled sort back where they came from."""
+        from PySide6.QtWidgets import QMessageBox
+        from src.core.journal import read_run_info
+
+        path = self.find_undoable_run()
+        if path is None:
+            QMessageBox.information(self.window, "Undo", "There is no sort to undo.")
+            return
+        moved = read_run_info(path)["moves"]
+        reply = QMessageBox.question(
+            self.window, "Undo Last Sort",
+            f"Move {moved} file(s) from the last sort back to where they came from?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.jobs.submit(self.make_undo_job(path))
+
+    def submit_job(self, dirs: Optional[List[Path]] = None, files: Optional[List[Path]] = None) -> None:
+        """Queue a background sort; the summary dialog is shown when it finishes."""
+        self.jobs.submit(self.make_job(dirs=dirs, files=files))
+
+    def cancel_sorting(self) -> None:
+        """Cancel the running sort and anything queued behind it."""
+        self.jobs.cancel_all()
+
+    def shutdown(self) -> None:
+        """Stop the background sorter; called when the main window closes."""
+        self.jobs.stop()
+        if self._run_scan is not None:
+            self._run_scan.wait()
+
+    def show_summary(self, totals: dict) -> None:
+        """Show the moved/skipped/errors totals of a finished sort run."""
+        if "plan" in totals:
+            self.show_plan(totals["plan"])
+            return
+        from PySide6.QtWidgets import QMessageBox
 
         box = QMessageBox(self.window)
-        box.setWindowTitle("Sorting Complete")
-        box.setText(f"Sorted: {moved}\nNo extension matched: {skipped}\nErrors: {errors}")
+        if totals.get("undo"):
+            box.setWindowTitle("Undo Cancelled" if totals.get("cancelled") else "Undo Complete")
+            box.setText(f"Restored: {totals['moved']}\nMissing or replaced: {totals['skipped']}\n"
+                        f"Errors: {totals['errors']}")
+        else:
+            box.setWindowTitle("Sorting Cancelled" if totals.get("cancelled") else "Sorting Complete")
+            text = ""
+            if totals.get("sources", 0) > 1:
+                text += f"Sources: {totals['sources']}\n"
+            text += f"Sorted: {totals['moved']}\nNo extension matched: {totals['skipped']}\n"
+            if totals.get("duplicates"):
+                text += f"Already in destination: {totals['duplicates']}\n"
+            box.setText(text + f"Errors: {totals['errors']}")
+            metrics = totals.get("metrics")
+            if metrics:
+                box.setInformativeText(self.format_run_stats(metrics))
+                box.setDetailedText(self.format_run_details(metrics))
 
         box.setOption(QMessageBox.DontUseNativeDialog, True)  # <-- force Qt dialog
         box.setIcon(QMessageBox.NoIcon)  # <-- avoid Windows "info" beep
@@ -98,30 +156,58 @@ class FileLogic:
 
         box.exec()
 
-    def sort_individual_files(self, files: List[Path]):
-        """Sort a list of individual files dropped or manually selected by the user."""
-        if not self.folder_rules:
-            QMessageBox.information(self.window, "No Rules", "Add at least one folder with allowed extensions first.")
+    @staticmethod
+    def format_run_stats(metrics: dict) -> str:
+        """One-glance throughput line plus error categories for the summary dialog."""
+        lines = [f"Took {metrics['elapsed_s']:.2f}s: {metrics['files_per_s']:.0f} files/s, "
+                 f"{Helper.format_bytes(metrics['bytes_per_s'])}/s"]
+        for category, count in sorted(metrics["errors"].items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {category.replace('_', ' ')}: {count}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def format_run_details(metrics: dict, slowest: int = 5) -> str:
+        """Phase times, per-rule counts, slowest destinations and sample errors."""
+        lines = ["Time per phase (summed over workers):"]
+        lines += [f"  {name}: {sec:.3f}s" for name, sec in metrics["phases_s"].items()]
+        lines.append("Files per rule:")
+        lines += [f"  {name}: {count}" for name, count in
+                  sorted(metrics["per_rule"].items(), key=lambda kv: -kv[1])]
+        destinations = sorted(metrics["destinations"].items(), key=lambda kv: -kv[1]["avg_ms"])[:slowest]
+        if destinations:
+            lines.append("Slowest destinations (avg / max per file):")
+            lines += [f"  {path}: {s['avg_ms']:.1f} / {s['max_ms']:.1f} ms ({s['files']} files)"
+                      for path, s in destinations]
+        if metrics["error_samples"]:
+            lines.append("Errors:")
+            lines += [f"  {sample}" for sample in metrics["error_samples"]]
+        return "\n".join(lines)
+
+    def show_plan(self, plan) -> None:
+        """Show a dry-run plan and offer to execute it as-is."""
+        if plan.cancelled:
             return
-        moved = skipped = errors = 0
-        for f in files:
-            if not f.exists() or not f.is_file():
-                continue
-            result = self._move_one_file(f)
-            if result == "moved":
-                moved += 1
-            elif result == "skipped":
-                skipped += 1
-            else:
-                errors += 1
+        from PySide6.QtWidgets import QMessageBox
+
+        lines = [f"Files to sort: {len(plan.moves)} ({Helper.format_bytes(plan.total_bytes)})",
+                 f"No extension matched: {plan.skipped}",
+                 f"Renames (same drive): {plan.renames}",
+                 f"Copies (other drive): {plan.copies}"]
+        if plan.errors:
+            lines.append(f"Unreadable: {plan.errors}")
+        for stats in sorted(plan.per_rule.values(), key=lambda s: -s["files"]):
+            lines.append(f"  {stats['name']}: {stats['files']} ({Helper.format_bytes(stats['bytes'])})")
 
         box = QMessageBox(self.window)
-        box.setWindowTitle("Sorting Complete")
-        box.setText(f"Sorted: {moved}\nNo extension matched: {skipped}\nErrors: {errors}")
+        box.setWindowTitle("Sort Preview")
+        box.setText("\n".join(lines))
 
         box.setOption(QMessageBox.DontUseNativeDialog, True)  # <-- force Qt dialog
         box.setIcon(QMessageBox.NoIcon)  # <-- avoid Windows "info" beep
-        box.setStandardButtons(QMessageBox.Ok)
+        sort_button = box.addButton("Sort Now", QMessageBox.AcceptRole)
+        box.addButton(QMessageBox.Cancel)
+        box.setDefaultButton(sort_button)
 
         box.exec()
-
+        if box.clickedButton() == sort_button and plan.moves:
+            self.jobs.submit(self.make_plan_job(plan))
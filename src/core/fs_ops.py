@@ -0,0 +1,198 @@
+import ctypes
+import errno
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.core.dedupe import full_hash
+
+COPY_CHUNK = 1024 * 1024            # Bytes per copy_file_range/sendfile/read call
+LARGE_FILE = 64 * 1024 * 1024       # Cross-device copies from this size on get their own lane
+VERIFY_MODES = ("size", "hash")
+
+_FAST_COPY_UNSUPPORTED = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+    errno.ENOTSUP, errno.EBADF, errno.ENOTSOCK,
+}
+# Filesystems without hard links (FAT, exFAT, some network shares) refuse os.link with these
+_LINK_UNSUPPORTED = {errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOSYS, errno.EMLINK}
+
+_AT_FDCWD = -100
+_RENAME_NOREPLACE = 1
+
+
+def _load_renameat2():
+    """libc's renameat2 on Linux (glibc 2.28+), else None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        func = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint)
+    func.restype = ctypes.c_int
+    return func
+
+
+_renameat2 = _load_renameat2()
+
+
+def copy_file_data(src: Path, dst: Path, fsync: bool = False, options: Optional["CopyOptions"] = None,
+                   on_bytes: Optional[Callable[[int], None]] = None) -> None:
+    """
+    Copy the contents of `src` into a new file `dst`.
+    Uses the kernel-side os.copy_file_range / os.sendfile where available and
+    falls back to a plain chunked read/write loop, in `options.chunk` steps;
+    `on_bytes(n)` is called after every chunk. With `fsync` the data is
+    flushed to disk before returning, so the source can be unlinked safely.
+    The copy is verified (see CopyOptions.verify) and removed again if the
+    check fails or the source changed while it was being copied.
+    """
+    options = options or CopyOptions()
+    with open(src, "rb") as fsrc:
+        before = os.fstat(fsrc.fileno())
+        fdst = open(dst, "xb")      # never clobber an existing file
+        try:
+            with fdst:
+                copied = _copy_fds(fsrc, fdst, options.chunk, on_bytes)
+                if fsync:
+                    fdst.flush()
+                    os.fsync(fdst.fileno())
+                written = os.fstat(fdst.fileno()).st_size
+            after = os.fstat(fsrc.fileno())
+            if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+                raise OSError(errno.EAGAIN, "Source changed while it was being copied", str(src))
+            if not copied == written == before.st_size:
+                raise OSError(errno.EIO, f"Incomplete copy: {written} of {before.st_size} bytes", str(dst))
+            if options.verify == "hash" and full_hash(src) != full_hash(dst):
+                raise OSError(errno.EIO, "Copy does not match the source", str(dst))
+            shutil.copystat(src, dst)
+        except BaseException:
+            try:
+                os.unlink(dst)      # drop the partial copy
+            except OSError:
+                pass
+            raise
+
+
+def _copy_fds(fsrc, fdst, chunk: int = COPY_CHUNK, on_bytes: Optional[Callable[[int], None]] = None) -> int:
+    """Copy fsrc into fdst, preferring in-kernel copies over read/write; returns the bytes copied."""
+    in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+
+    for fast_copy in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+        if fast_copy is None:
+            continue
+        copied = 0
+        try:
+            while True:
+                if fast_copy is os.sendfile:
+                    n = os.sendfile(out_fd, in_fd, None, chunk)
+                else:
+                    n = fast_copy(in_fd, out_fd, chunk)
+                if n == 0:
+                    return copied
+                copied += n
+                if on_bytes is not None:
+                    on_bytes(n)
+        except OSError as e:
+            # Unsupported for this fs pair: rewind whatever was written and try the next method
+            if e.errno not in _FAST_COPY_UNSUPPORTED:
+                raise
+            if copied and on_bytes is not None:
+                on_bytes(-copied)
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+
+    copied = 0
+    buffer = bytearray(chunk)
+    view = memoryview(buffer)
+    while True:
+        n = fsrc.readinto(buffer)
+        if not n:
+            return copied
+        fdst.write(view[:n])
+        copied += n
+        if on_bytes is not None:
+            on_bytes(n)
+
+
+class CopyOptions:
+    """
+    How files are copied when a move crosses devices.
+    chunk: bytes per copy call, i.e. how often progress is reported.
+    verify: 'size' checks the copy's length and that the source did not
+            change during the copy; 'hash' also compares full BLAKE2b hashes
+            (reads both files again) before the source is unlinked.
+    large_file: cross-device files from this size on are moved on their own
+                lane, so a backlog of small files never waits behind them.
+    """
+    def __init__(self, chunk: int = COPY_CHUNK, verify: str = "size", large_file: int = LARGE_FILE):
+        if verify not in VERIFY_MODES:
+            raise ValueError(f"verify must be one of {VERIFY_MODES}")
+        self.chunk = max(64 * 1024, int(chunk))
+        self.verify = verify
+        self.large_file = int(large_file)
+
+
+def rename_noreplace(src: Path, dst: Path) -> None:
+    """
+    Rename `src` to `dst` on the same filesystem, raising FileExistsError
+    instead of replacing a file that appeared at `dst` (os.rename silently
+    overwrites on POSIX). Uses renameat2(RENAME_NOREPLACE) where the kernel
+    and filesystem support it, else os.link + os.unlink, and on filesystems
+    without hard links an lstat check right before the rename.
+    """
+    if os.name == "nt":
+        os.rename(src, dst)     # never replaces an existing file on Windows
+        return
+    if _renameat2 is not None:
+        if _renameat2(_AT_FDCWD, os.fsencode(src), _AT_FDCWD, os.fsencode(dst), _RENAME_NOREPLACE) == 0:
+            return
+        err = ctypes.get_errno()
+        if err not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP):
+            raise OSError(err, os.strerror(err), str(src), None, str(dst))
+    if not os.path.isdir(src):
+        try:
+            os.link(src, dst, follow_symlinks=False)
+        except OSError as e:
+            if e.errno not in _LINK_UNSUPPORTED:
+                raise
+        else:
+            try:
+                os.unlink(src)
+            except OSError:
+                os.unlink(dst)      # keep the source; do not leave an extra link behind
+                raise
+            return
+    if os.path.lexists(dst):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), str(dst))
+    os.rename(src, dst)
+
+
+def move_file(src: Path, dst: Path, same_device: bool, fsync: bool = False,
+              options: Optional[CopyOptions] = None, on_bytes: Optional[Callable[[int], None]] = None) -> None:
+    """
+    Move `src` to the (free) target path `dst`; never replaces a file that
+    already exists there (FileExistsError instead, so the caller can pick
+    another name). On the same filesystem this is a single rename_noreplace;
+    across devices the data is copied with copy_file_data and the source is
+    unlinked only after the copy completed and was verified.
+    """
+    if same_device:
+        try:
+            rename_noreplace(src, dst)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+
+    if os.path.islink(src):
+        os.symlink(os.readlink(src), dst)   # move the link itself, not its target
+        os.unlink(src)
+        return
+
+    copy_file_data(src, dst, fsync, options, on_bytes)
+    os.unlink(src)
@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.core.fs_ops import move_file
+
+JOURNAL_DIRNAME = "journals"    # Created next to folder_rules.json
+KEEP_RUNS = 50                  # finished journals kept per rules file
+MAX_AGE_DAYS = 90               # finished journals older than this are removed
+TAIL_BYTES = 4096               # read from the end of a journal to find its status
+
+
+def journal_dir_for(rules_path: Path) -> Path:
+    """Where sort journals live for a given rules file."""
+    return rules_path.parent / JOURNAL_DIRNAME
+
+
+class MoveJournal:
+    """
+    Append-only JSON-lines record of one sort run.
+    The first line is a header describing the run (sources, options, rules
+    snapshot); every completed move appends {"s": source, "d": target, "z": size}
+    and the run ends with {"type": "end", "status": ..., "moves": count}, so
+    listing runs only needs the first and last line. Records are
+    buffered and written + fsync'd in groups of `batch_size` or every
+    `flush_interval` seconds instead of once per file. Thread-safe.
+    """
+    def __init__(self, path: Path, batch_size: int = 256, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self.moves = 0                  # moves recorded in this journal, for the end record
+        self._file = open(path, "a", encoding="utf-8")
+
+    @classmethod
+    def start(cls, journal_dir: Path, header: dict, **kwargs) -> "MoveJournal":
+        """Create a new journal for a run and durably write its header."""
+        journal_dir.mkdir(parents=True, exist_ok=True)
+        run_id = time.strftime("%Y%m%d-%H%M%S") + f"-{time.time_ns() // 1000 % 1000000:06d}"
+        journal = cls(journal_dir / f"{run_id}.jsonl", **kwargs)
+        journal.write_record({"type": "run", "id": run_id, "started": time.time(), **header})
+        return journal
+
+    def write_record(self, record: dict) -> None:
+        """Append a control record (header, resume, end) and flush it immediately."""
+        with self._lock:
+            self._buffer.append(json.dumps(record))
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        self._file.write("\n".join(self._buffer) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+    def record(self, source: Path, target: Path, size: int) -> None:
+        """Log a completed move; durable once the current group is flushed."""
+        with self._lock:
+            self._buffer.append(json.dumps({"s": str(source), "d": str(target), "z": size}))
+            self.moves += 1
+            if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self, status: str) -> None:
+        """Write the end record ('complete', 'cancelled', 'undone', ...) and close."""
+        self.write_record({"type": "end", "status": status, "ended": time.time(), "moves": self.moves})
+        self._file.close()
+
+
+def read_journal(path: Path) -> dict:
+    """
+    Parse a journal into {"header", "moves": [(src, dst)], "status"}.
+    status is the last end record, or 'incomplete' if the run never finished
+    (crash or power loss). A torn final line is ignored.
+    """
+    header = {}
+    moves = []
+    status = "incomplete"
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "s" in record:
+                moves.append((record["s"], record["d"]))
+            elif record.get("type") == "run":
+                header = record
+            elif record.get("type") == "end":
+                status = record.get("status", "complete")
+            elif record.get("type") == "resume":
+                status = "incomplete"
+    return {"header": header, "moves": moves, "status": status}
+
+
+def _count_moves(path: Path) -> int:
+    """Count move records without parsing them; for journals that have no end record yet."""
+    count = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.startswith(b'{"s": '):
+                count += 1
+    return count
+
+
+def read_run_info(path: Path) -> dict:
+    """
+    Summary of a journal as {"header", "status", "moves": count}, reading only
+    the first line and the tail. Moves are counted by scanning the file only
+    for interrupted runs (and journals written before the end record had a
+    count); finished runs cost two small reads however many files they moved.
+    """
+    header = {}
+    status = "incomplete"
+    moves = None
+    with open(path, "rb") as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            pass
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - TAIL_BYTES))
+        tail = f.read().splitlines()
+    for line in reversed(tail):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue        # torn final line, or the start of a line cut by the seek
+        if record.get("type") == "end":
+            status = record.get("status", "complete")
+            moves = record.get("moves")
+        break
+    if moves is None:
+        moves = _count_moves(path)
+    return {"header": header, "status": status, "moves": moves}
+
+
+def list_runs(journal_dir: Path) -> list:
+    """All journals in `journal_dir`, oldest first, as (path, read_run_info summary)."""
+    if not journal_dir.is_dir():
+        return []
+    return [(p, read_run_info(p)) for p in sorted(journal_dir.glob("*.jsonl"))]
+
+
+def prune_journals(journal_dir: Path, keep_runs: int = KEEP_RUNS, max_age_days: float = MAX_AGE_DAYS) -> int:
+    """
+    Remove finished journals beyond the newest `keep_runs` or older than
+    `max_age_days`, so the run list (and the startup check for interrupted
+    runs) stays small. Interrupted runs are kept until they are resumed or
+    abandoned. Returns the number of journals removed.
+    """
+    if not journal_dir.is_dir():
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for index, path in enumerate(sorted(journal_dir.glob("*.jsonl"), reverse=True)):
+        try:
+            if index < keep_runs and path.stat().st_mtime >= cutoff:
+                continue
+            if read_run_info(path)["status"] == "incomplete":
+                continue
+            path.unlink()
+            removed += 1
+        except OSError as e:
+            print(f"Could not remove old journal {path}: {e}")
+    return removed
+
+
+def mark_run(path: Path, status: str, moves: Optional[int] = None) -> None:
+    """Append a status change (e.g. 'abandoned') to an existing journal."""
+    journal = MoveJournal(path)
+    journal.moves = read_run_info(path)["moves"] if moves is None else moves
+    journal.close(status)
+
+
+def undo_run(path: Path, workers: int = 4, cancel: Optional[threading.Event] = None,
+             on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+    """
+    Move every file recorded in a journal back to where it came from, newest
+    first. Files that were since removed from the destination, or whose
+    original location is occupied again, are left alone and counted as skipped.
+    Files an earlier, cancelled undo already put back are passed over without
+    being counted, so undoing a partially undone run finishes the job.
+    """
+    moves = read_journal(path)["moves"]
+    totals = {"undo": True, "scanned": 0, "moved": 0, "skipped": 0, "errors": 0, "bytes": 0, "cancelled": False}
+    lock = threading.Lock()
+
+    def _restore(src: str, dst: str) -> str:
+        if cancel is not None and cancel.is_set():
+            return "cancelled"
+        source, target = Path(src), Path(dst)
+        try:
+            if source.exists():
+                # Back in place and nothing left at the target: an earlier undo restored it
+                return "skipped" if target.exists() else "restored"
+            if not target.exists():
+                return "skipped"
+            source.parent.mkdir(parents=True, exist_ok=True)
+            same_device = target.stat().st_dev == source.parent.stat().st_dev
+            move_file(target, source, same_device)
+            return "moved"
+        except Exception as e:
+            print(f"Error restoring {target}: {e}")
+            return "error"
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="filesor-undo") as pool:
+        for status in pool.map(lambda m: _restore(*m), reversed(moves)):
+            with lock:
+                totals["scanned"] += 1
+                if status in ("moved", "skipped"):
+                    totals[status] += 1
+                elif status == "error":
+                    totals["errors"] += 1
+            if on_progress is not None and totals["scanned"] % 256 == 0:
+                on_progress(dict(totals))
+
+    totals["cancelled"] = cancel is not None and cancel.is_set()
+    mark_run(path, "partially-undone" if totals["cancelled"] else "undone", len(moves))
+    if on_progress is not None:
+        on_progress(dict(totals))
+    return totals
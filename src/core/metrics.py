@@ -0,0 +1,174 @@
+import errno
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+MAX_ERROR_SAMPLES = 20
+
+
+def categorize_error(exc: BaseException) -> str:
+    """Map an exception from a move to a short, stable category name."""
+    if isinstance(exc, PermissionError):
+        return "permission"
+    if isinstance(exc, FileNotFoundError):
+        return "not_found"
+    if isinstance(exc, FileExistsError):
+        return "exists"
+    if isinstance(exc, OSError):
+        return {
+            errno.ENOSPC: "no_space",
+            errno.EROFS: "read_only",
+            errno.ENAMETOOLONG: "name_too_long",
+            errno.EBUSY: "busy",
+            errno.EIO: "io",
+        }.get(exc.errno, "os_error")
+    return "other"
+
+
+class _PhaseTimer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: "RunMetrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class RunMetrics:
+    """
+    Thread-safe statistics for one sort run: time per phase, per-rule counts,
+    per-destination move latency and categorized errors.
+    Phase times are summed over all threads, so the 'move' phase of a run
+    with 8 workers can exceed the wall-clock time.
+    `hooks` are optional callables receiving (event, payload) for the
+    'error' and 'finished' events, e.g. to feed a profiler or exporter.
+    """
+    def __init__(self, hooks: Optional[Iterable[Callable[[str, dict], None]]] = None):
+        self.hooks = list(hooks or [])
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._elapsed: Optional[float] = None
+        self.phases = {}            # phase -> seconds
+        self.per_rule = {}          # rule name -> files matched
+        self.destinations = {}      # folder -> [files, bytes, total seconds, max seconds]
+        self.errors = {}            # category -> count
+        self.error_samples = []     # first few "path: message" strings
+        self.moved = 0
+        self.bytes = 0
+
+    def phase(self, name: str) -> _PhaseTimer:
+        """Context manager adding the time spent inside it to `name`."""
+        return _PhaseTimer(self, name)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count_rule(self, rule: Optional[dict]) -> None:
+        name = (rule.get('name') or rule.get('path', '')) if rule else "(no match)"
+        with self._lock:
+            self.per_rule[name] = self.per_rule.get(name, 0) + 1
+
+    def record_move(self, dest_dir: Path, seconds: float, size: int) -> None:
+        key = str(dest_dir)
+        with self._lock:
+            self.moved += 1
+            self.bytes += size
+            self.phases["move"] = self.phases.get("move", 0.0) + seconds
+            stats = self.destinations.get(key)
+            if stats is None:
+                stats = self.destinations[key] = [0, 0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += size
+            stats[2] += seconds
+            stats[3] = max(stats[3], seconds)
+
+    def record_error(self, path: Path, exc: BaseException) -> None:
+        category = categorize_error(exc)
+        with self._lock:
+            self.errors[category] = self.errors.get(category, 0) + 1
+            if len(self.error_samples) < MAX_ERROR_SAMPLES:
+                self.error_samples.append(f"{path}: {exc}")
+        self._emit("error", {"path": str(path), "category": category, "message": str(exc)})
+
+    def finish(self) -> dict:
+        """Freeze the wall-clock time, notify hooks and return the summary."""
+        if self._elapsed is None:
+            self._elapsed = time.perf_counter() - self._started
+        summary = self.summary()
+        self._emit("finished", summary)
+        return summary
+
+    def _emit(self, event: str, payload: dict) -> None:
+        for hook in self.hooks:
+            try:
+                hook(event, payload)
+            except Exception as e:
+                print(f"Metrics hook failed: {e}")
+
+    def summary(self) -> dict:
+        """Plain-dict view of everything collected, suitable for JSON."""
+        with self._lock:
+            elapsed = self._elapsed if self._elapsed is not None else time.perf_counter() - self._started
+            wall = elapsed or 1e-9
+            return {
+                "elapsed_s": round(elapsed, 4),
+                "moved": self.moved,
+                "bytes": self.bytes,
+                "files_per_s": round(self.moved / wall, 1),
+                "bytes_per_s": round(self.bytes / wall, 1),
+                "phases_s": {name: round(sec, 4) for name, sec in self.phases.items()},
+                "per_rule": dict(self.per_rule),
+                "destinations": {
+                    path: {"files": s[0], "bytes": s[1],
+                           "avg_ms": round(s[2] / s[0] * 1000, 3) if s[0] else 0.0,
+                           "max_ms": round(s[3] * 1000, 3)}
+                    for path, s in self.destinations.items()
+                },
+                "errors": dict(self.errors),
+                "error_samples": list(self.error_samples),
+            }
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def to_prometheus(summary: dict) -> str:
+    """Render a RunMetrics summary in the Prometheus text exposition format."""
+    lines = [
+        "# TYPE filesor_run_elapsed_seconds gauge",
+        f"filesor_run_elapsed_seconds {summary['elapsed_s']}",
+        "# TYPE filesor_files_moved_total counter",
+        f"filesor_files_moved_total {summary['moved']}",
+        "# TYPE filesor_bytes_moved_total counter",
+        f"filesor_bytes_moved_total {summary['bytes']}",
+        "# TYPE filesor_phase_seconds gauge",
+    ]
+    lines += [f'filesor_phase_seconds{{phase="{_label(k)}"}} {v}' for k, v in summary["phases_s"].items()]
+    lines.append("# TYPE filesor_rule_files_total counter")
+    lines += [f'filesor_rule_files_total{{rule="{_label(k)}"}} {v}' for k, v in summary["per_rule"].items()]
+    lines.append("# TYPE filesor_destination_move_ms gauge")
+    for path, stats in summary["destinations"].items():
+        lines.append(f'filesor_destination_move_ms{{dest="{_label(path)}",stat="avg"}} {stats["avg_ms"]}')
+        lines.append(f'filesor_destination_move_ms{{dest="{_label(path)}",stat="max"}} {stats["max_ms"]}')
+    lines.append("# TYPE filesor_errors_total counter")
+    lines += [f'filesor_errors_total{{category="{_label(k)}"}} {v}' for k, v in summary["errors"].items()]
+    return "\n".join(lines) + "\n"
+
+
+def dump_metrics(summary: dict, path: Path) -> None:
+    """Write a summary as Prometheus text (.prom/.txt) or JSON (anything else)."""
+    if path.suffix in (".prom", ".txt"):
+        path.write_text(to_prometheus(summary), encoding="utf-8")
+    else:
+        path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
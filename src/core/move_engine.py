@@ -0,0 +1,332 @@
+import errno
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from src.core.dedupe import Deduplicator
+from src.core.destinations import destination_for
+from src.core.device_scheduler import DeviceScheduler, device_of
+from src.core.fs_ops import CopyOptions, move_file
+from src.core.metrics import RunMetrics
+from src.core.name_cache import DestinationNames
+from src.core.sniffer import ContentSniffer, classify_files
+
+CLAIM_RETRIES = 16      # fresh names tried when files keep appearing at the claimed target
+
+
+class _DestinationLane:
+    """
+    Shared state for every file headed to one destination folder.
+    Names are claimed in submission order on the producer thread; the lock
+    guards the name cache against workers releasing names of failed moves.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.names = DestinationNames(path)     # listed once, updated as files land
+        self.ready = False                      # destination folder created
+        self.device = None                      # st_dev of the destination folder
+
+    def claim(self, filename: str) -> Path:
+        """Create the folder on first use, then claim a collision-free target."""
+        with self.lock:
+            if not self.ready:
+                self.path.mkdir(parents=True, exist_ok=True)
+                self.device = os.stat(self.path).st_dev
+                self.ready = True
+            return self.names.claim(filename)
+
+    def release(self, target: Path) -> None:
+        with self.lock:
+            self.names.release(target)
+
+
+class MoveEngine:
+    """
+    Concurrent file mover used by FileLogic.
+    Rules and target names are resolved on the calling thread, then moves
+    are fanned out through a DeviceScheduler: `workers` is the concurrency
+    per device (overridable per st_dev with `device_limits`), so runs that
+    span several disks use all of them without overloading the slow ones.
+    Cross-device files of copy_options.large_file bytes or more are copied
+    on a separate per-device lane with byte-level progress, so a backlog
+    of small files keeps moving next to them.
+    Because names are claimed in input order, a run produces exactly the
+    targets a SortPlan built from the same input predicted.
+    """
+    PROGRESS_INTERVAL = 0.1     # Seconds between progress callbacks
+
+    def __init__(self, find_rule: Callable, workers: int = 4, fsync: bool = False,
+                 on_moved: Optional[Callable[[Path, Path, int], None]] = None,
+                 metrics: Optional[RunMetrics] = None, sniffer: Optional[ContentSniffer] = None,
+                 dedupe: Optional[Deduplicator] = None, on_skipped: Optional[Callable[[Path], None]] = None,
+                 device_limits: Optional[dict] = None, copy_options: Optional[CopyOptions] = None,
+                 on_result: Optional[Callable[[Path, str, Optional[Path], int], None]] = None):
+        self.find_rule = find_rule
+        self.workers = max(1, int(workers))
+        self.device_limits = device_limits or {}    # st_dev -> concurrent moves on that device
+        self.copy_options = copy_options or CopyOptions()   # chunking, verification, large-file lane
+        self.fsync = fsync          # fsync cross-device copies before unlinking the source
+        self.on_moved = on_moved    # (source, target, size) after each completed move, e.g. a journal
+        self.metrics = metrics or RunMetrics()
+        self.sniffer = sniffer      # classify by content when the extension matches no rule
+        self.dedupe = dedupe        # skip or hard-link files already present in the destination
+        self.on_skipped = on_skipped    # (source) for files no rule matched, e.g. a ScanIndex
+        # (source, status, target or None, size) once per file; status is moved/skipped/duplicate/
+        # error/cancelled. Called from worker threads and may block to slow the run down.
+        self.on_result = on_result
+
+    def run(self, files: Iterable[Path], cancel: Optional[threading.Event] = None,
+            on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Move every file in `files` and return the run totals:
+        moved/skipped/errors plus scanned, bytes, duplicates, whether it was
+        cancelled and the RunMetrics summary under "metrics". While large
+        files are being copied, "copying" holds the bytes copied so far.
+        `on_progress` receives a copy of the totals at most every
+        PROGRESS_INTERVAL seconds (and once at the end); it may be called from
+        worker threads.
+        """
+        metrics = self.metrics
+
+        def scanned():
+            it = iter(files)
+            while True:
+                with metrics.phase("scan"):
+                    entry = next(it, None)
+                if entry is None:
+                    return
+                yield entry
+
+        def tasks():
+            for entry, rule in classify_files(scanned(), self.find_rule, self.sniffer, metrics):
+                if rule is None:
+                    yield entry, None, None, None
+                    continue
+                try:
+                    with metrics.phase("match"):
+                        dest_dir, st = destination_for(rule, entry)
+                except ValueError as e:
+                    metrics.record_error(entry, e)
+                    dest_dir, st = None, None   # counted as an error, never moved
+                yield entry, rule, dest_dir, st
+
+        return self._execute(tasks(), cancel, on_progress)
+
+    def run_plan(self, plan, cancel: Optional[threading.Event] = None,
+                 on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Execute a SortPlan without rescanning or re-matching rules.
+        Targets are re-claimed in plan order, so they match the plan unless a
+        destination changed on disk since it was built.
+        """
+        tasks = ((move.source, move.rule, move.target.parent, None) for move in plan.moves)
+        totals = self._execute(tasks, cancel, on_progress)
+        totals["scanned"] += plan.skipped
+        totals["skipped"] += plan.skipped
+        if plan.skipped:
+            totals["metrics"]["per_rule"]["(no match)"] = plan.skipped
+        return totals
+
+    def _execute(self, tasks: Iterable[tuple], cancel: Optional[threading.Event],
+                 on_progress: Optional[Callable[[dict], None]]) -> dict:
+        """
+        Run (file, rule, destination folder, stat or None) tasks through the
+        device scheduler; rule None = skip, destination None = error (already
+        recorded in the metrics). Each distinct destination folder
+        gets one lane, so it is created and listed once per run. Moves are
+        keyed by the source folder's and the destination's device.
+        """
+        metrics = self.metrics
+        totals = {"scanned": 0, "moved": 0, "skipped": 0, "errors": 0, "bytes": 0, "duplicates": 0,
+                  "copying": 0, "cancelled": False}
+        totals_lock = threading.Lock()
+        last_report = [0.0]
+        lanes = {}
+        source_devices = {}     # source folder -> st_dev, one stat per folder
+        if self.dedupe is not None:
+            self.dedupe.start_run()
+
+        def _report(force: bool = False):
+            if on_progress is None:
+                return
+            now = time.monotonic()
+            with totals_lock:
+                if not force and now - last_report[0] < self.PROGRESS_INTERVAL:
+                    return
+                last_report[0] = now
+                snapshot = dict(totals)
+            on_progress(snapshot)
+
+        def _done(future, entry: Path):
+            status, size, target = future.result()
+            if self.on_result is not None:
+                self.on_result(entry, status, target if status == "moved" else None, size)
+            with totals_lock:
+                if status == "moved":
+                    totals["moved"] += 1
+                    totals["bytes"] += size
+                elif status == "error":
+                    totals["errors"] += 1
+                elif status == "duplicate":
+                    totals["duplicates"] += 1
+            _report()
+
+        def _copy_progress():
+            """(on_bytes, close) pair that mirrors one large copy into totals["copying"]."""
+            copied = [0]
+
+            def on_bytes(n: int):
+                copied[0] += n
+                with totals_lock:
+                    totals["copying"] += n
+                _report()
+
+            def close():
+                with totals_lock:
+                    totals["copying"] -= copied[0]
+
+            return on_bytes, close
+
+        large_file = self.copy_options.large_file
+        with DeviceScheduler(self.workers, self.device_limits) as scheduler:
+            for entry, rule, dest_dir, st in tasks:
+                if cancel is not None and cancel.is_set():
+                    break
+                with totals_lock:
+                    totals["scanned"] += 1
+                metrics.count_rule(rule)
+
+                if rule is None:
+                    with totals_lock:
+                        totals["skipped"] += 1
+                    if self.on_skipped is not None:
+                        self.on_skipped(entry)
+                    if self.on_result is not None:
+                        self.on_result(entry, "skipped", None, 0)
+                    _report()
+                    continue
+
+                if dest_dir is None:
+                    with totals_lock:
+                        totals["errors"] += 1
+                    if self.on_result is not None:
+                        self.on_result(entry, "error", None, 0)
+                    continue
+
+                lane = lanes.get(dest_dir)
+                if lane is None:
+                    lane = lanes[dest_dir] = _DestinationLane(dest_dir)
+                try:
+                    with metrics.phase("claim"):
+                        target = lane.claim(entry.name)
+                except OSError as e:
+                    metrics.record_error(entry, e)
+                    with totals_lock:
+                        totals["errors"] += 1
+                    if self.on_result is not None:
+                        self.on_result(entry, "error", None, 0)
+                    continue
+
+                parent = entry.parent
+                if parent not in source_devices:
+                    source_devices[parent] = device_of(parent)
+                source_device = source_devices[parent]
+
+                devices, progress = (source_device, lane.device), None
+                if source_device != lane.device:    # renames take no time whatever the size
+                    if st is None:
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            pass                    # the move reports it
+                    if st is not None and st.st_size >= large_file:
+                        devices = tuple(("large", d) for d in devices)
+                        progress = _copy_progress()
+
+                # The scheduler bounds queued work per device, blocking here when it is full
+                with metrics.phase("wait"):
+                    future = scheduler.submit(devices, self._move_into,
+                                              entry, lane, target, cancel, st, progress)
+                future.add_done_callback(lambda f, e=entry: _done(f, e))
+
+        totals["cancelled"] = cancel is not None and cancel.is_set()
+        _report(force=True)
+        totals["metrics"] = metrics.finish()
+        return totals
+
+    def _move_into(self, entry: Path, lane: _DestinationLane, target: Path,
+                   cancel: Optional[threading.Event] = None, st: Optional[os.stat_result] = None,
+                   progress: Optional[tuple] = None) -> tuple:
+        """
+        Move one file to its claimed target and return (status, size, target).
+        Files on the same device as the destination are renamed, others go
+        through the chunked copy path; `progress` is an (on_bytes, close)
+        pair for large copies. A file that appeared at the target since the
+        folder was listed is never replaced: the next free name is claimed
+        instead, and the file counts as an error if none can be used.
+        """
+        on_bytes, close = progress or (None, None)
+        try:
+            return self._move_checked(entry, lane, target, cancel, st, on_bytes)
+        finally:
+            if close is not None:
+                close()
+
+    def _move_checked(self, entry: Path, lane: _DestinationLane, target: Path,
+                      cancel: Optional[threading.Event], st: Optional[os.stat_result], on_bytes) -> tuple:
+        if cancel is not None and cancel.is_set():
+            lane.release(target)
+            return "cancelled", 0, target
+        try:
+            if st is None:
+                st = entry.stat()
+            if self.dedupe is not None:
+                with self.metrics.phase("dedupe"):
+                    duplicate = self.dedupe.find_duplicate(entry, st, lane.path)
+                if duplicate is not None:
+                    return self._handle_duplicate(entry, st, lane, target, duplicate)
+            started = time.perf_counter()
+            for _ in range(CLAIM_RETRIES):
+                try:
+                    move_file(entry, target, st.st_dev == lane.device, self.fsync, self.copy_options, on_bytes)
+                    break
+                except FileExistsError:
+                    # Created by someone else after the listing; the name stays marked as taken
+                    target = lane.claim(entry.name)
+            else:
+                raise FileExistsError(errno.EEXIST, "No free name left in the destination", str(target))
+            self.metrics.record_move(lane.path, time.perf_counter() - started, st.st_size)
+            if self.dedupe is not None:
+                self.dedupe.landed(entry, target, st)
+        except Exception as e:
+            self.metrics.record_error(entry, e)
+            lane.release(target)
+            return "error", 0, target
+        if self.on_moved is not None:
+            try:
+                self.on_moved(entry, target, st.st_size)
+            except Exception as e:
+                print(f"Moved {entry} but could not record it: {e}")
+        return "moved", st.st_size, target
+
+    def _handle_duplicate(self, entry: Path, st: os.stat_result, lane: _DestinationLane, target: Path,
+                          duplicate: Path) -> tuple:
+        """Skip `entry`, or replace it with a hard link to the identical `duplicate`."""
+        if self.dedupe.action != "link" or st.st_dev != lane.device:
+            lane.release(target)
+            return "duplicate", 0, target
+        os.link(duplicate, target)
+        try:
+            os.unlink(entry)
+        except OSError:
+            os.unlink(target)   # keep the source; do not leave an extra link behind
+            raise
+        if self.on_moved is not None:
+            try:
+                self.on_moved(entry, target, st.st_size)
+            except Exception as e:
+                print(f"Linked {entry} but could not record it: {e}")
+        return "duplicate", 0, target
@@ -0,0 +1,61 @@
+import os
+from pathlib import Path
+from typing import Optional
+
+
+class DestinationNames:
+    """
+    In-memory view of the file names inside one destination folder.
+    The folder is listed once with os.scandir; after that every collision
+    check is a set lookup and each stem remembers its next free ' (n)'
+    suffix, so thousands of 'IMG_0001.jpg' land in constant time per file.
+    Names are compared with os.path.normcase so case-insensitive
+    filesystems are handled the same way the OS would.
+    Not thread-safe: callers serialize access per destination.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self._names: Optional[set] = None   # normcased names present or claimed
+        self._next_suffix = {}              # normcased (stem, suffix) -> next n to try
+
+    def _load(self) -> set:
+        names = set()
+        try:
+            with os.scandir(self.path) as it:
+                for entry in it:
+                    names.add(os.path.normcase(entry.name))
+        except FileNotFoundError:
+            pass
+        return names
+
+    def claim(self, filename: str) -> Path:
+        """
+        Return a collision-free target for `filename` and mark it as taken.
+        Example: 'file.txt' -> 'file (1).txt' if the name already exists.
+        """
+        if self._names is None:
+            self._names = self._load()
+
+        key = os.path.normcase(filename)
+        if key not in self._names:
+            self._names.add(key)
+            return self.path / filename
+
+        stem = Path(filename).stem
+        suffix = Path(filename).suffix
+        stem_key = (os.path.normcase(stem), os.path.normcase(suffix))
+        i = self._next_suffix.get(stem_key, 1)
+        while True:
+            name = f"{stem} ({i}){suffix}"
+            key = os.path.normcase(name)
+            i += 1
+            if key not in self._names:
+                break
+        self._names.add(key)
+        self._next_suffix[stem_key] = i
+        return self.path / name
+
+    def release(self, target: Path) -> None:
+        """Forget a claimed name whose move failed, so it is not reported as taken."""
+        if self._names is not None:
+            self._names.discard(os.path.normcase(target.name))
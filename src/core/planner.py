@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from src.core.destinations import destination_for
+from src.core.name_cache import DestinationNames
+from src.core.sniffer import classify_files
+
+
+class PlannedMove:
+    """One file of a SortPlan and where it will end up."""
+    __slots__ = ("source", "target", "rule", "size", "same_device")
+
+    def __init__(self, source: Path, target: Path, rule: dict, size: int, same_device: bool):
+        self.source = source
+        self.target = target
+        self.rule = rule
+        self.size = size
+        self.same_device = same_device
+
+
+class SortPlan:
+    """
+    The full, collision-free result of a sort computed without touching disk.
+    Can be summarized for display and later executed with MoveEngine.run_plan.
+    """
+    def __init__(self):
+        self.moves: list = []
+        self.scanned = 0
+        self.skipped = 0        # no rule matched
+        self.errors = 0         # could not stat the source
+        self.total_bytes = 0
+        self.renames = 0        # same-filesystem moves
+        self.copies = 0         # cross-device copy + delete
+        self.per_rule = {}      # rule path -> {"name", "files", "bytes"}
+        self.cancelled = False
+        self.dirs: list = []    # sources the plan was built from
+        self.files: list = []
+
+    def add(self, move: PlannedMove) -> None:
+        self.moves.append(move)
+        self.total_bytes += move.size
+        if move.same_device:
+            self.renames += 1
+        else:
+            self.copies += 1
+        stats = self.per_rule.get(move.rule['path'])
+        if stats is None:
+            stats = self.per_rule[move.rule['path']] = {"name": move.rule.get('name', ''), "files": 0, "bytes": 0}
+        stats["files"] += 1
+        stats["bytes"] += move.size
+
+    def summary(self) -> dict:
+        """Plain-dict summary, suitable for JSON or a dialog."""
+        return {
+            "scanned": self.scanned,
+            "files": len(self.moves),
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "bytes": self.total_bytes,
+            "renames": self.renames,
+            "copies": self.copies,
+            "per_rule": self.per_rule,
+            "cancelled": self.cancelled,
+        }
+
+
+def _device_of(path: Path) -> Optional[int]:
+    """st_dev of `path`, or of its nearest existing parent if it does not exist yet."""
+    for p in (path, *path.parents):
+        try:
+            return os.stat(p).st_dev
+        except OSError:
+            continue
+    return None
+
+
+def build_plan(files: Iterable[Path], find_rule: Callable, cancel: Optional[threading.Event] = None,
+               on_progress: Optional[Callable[[dict], None]] = None, progress_interval: float = 0.1,
+               sniffer=None) -> SortPlan:
+    """
+    Resolve every file's rule and final target path in memory.
+    Targets are claimed from the same DestinationNames cache the engine
+    uses, in the same order, so executing the plan yields these exact paths.
+    """
+    plan = SortPlan()
+    names = {}
+    devices = {}
+    last_report = 0.0
+
+    for entry, rule in classify_files(files, find_rule, sniffer):
+        if cancel is not None and cancel.is_set():
+            plan.cancelled = True
+            break
+        plan.scanned += 1
+
+        if not rule:
+            plan.skipped += 1
+        else:
+            try:
+                dest_dir, st = destination_for(rule, entry)
+                st = st or entry.stat()
+            except (OSError, ValueError) as e:
+                print(f"Cannot plan {entry}: {e}")
+                plan.errors += 1
+                continue
+
+            cache = names.get(dest_dir)
+            if cache is None:
+                cache = names[dest_dir] = DestinationNames(dest_dir)
+                devices[dest_dir] = _device_of(dest_dir)
+            target = cache.claim(entry.name)
+            plan.add(PlannedMove(entry, target, rule, st.st_size, st.st_dev == devices[dest_dir]))
+
+        if on_progress is not None and time.monotonic() - last_report >= progress_interval:
+            last_report = time.monotonic()
+            on_progress({"planning": True, "scanned": plan.scanned, "moved": 0, "skipped": plan.skipped,
+                         "errors": plan.errors, "bytes": plan.total_bytes, "cancelled": False})
+    return plan
@@ -0,0 +1,224 @@
+import fnmatch
+import os
+import re
+import shlex
+import time
+from pathlib import Path
+from typing import Optional
+
+SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2,
+              "g": 1024 ** 3, "gb": 1024 ** 3, "t": 1024 ** 4, "tb": 1024 ** 4}
+AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400, "y": 365 * 86400}
+
+# Keys allowed in a rule's "match" object
+MATCH_KEYS = ("name", "regex", "path", "min_size", "max_size", "older_than", "newer_than")
+
+
+def parse_size(value) -> int:
+    """'10M', '512k', '2 GB' or a plain number of bytes -> bytes."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    m = re.fullmatch(r"\s*([\d.]+)\s*([a-zA-Z]*)\s*", str(value))
+    if not m or m.group(2).lower() not in SIZE_UNITS:
+        raise ValueError(f"Invalid size: {value!r}")
+    return int(float(m.group(1)) * SIZE_UNITS[m.group(2).lower()])
+
+
+def parse_age(value) -> float:
+    """'30d', '12h', '2w' or a plain number of seconds -> seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = re.fullmatch(r"\s*([\d.]+)\s*([smhdwy]?)\s*", str(value).lower())
+    if not m:
+        raise ValueError(f"Invalid age: {value!r}")
+    return float(m.group(1)) * AGE_UNITS.get(m.group(2) or "s")
+
+
+def normalize_match(raw) -> dict:
+    """
+    Validate the "match" object of a rule from JSON. Unknown keys and
+    invalid values are dropped (with a message) instead of failing the load.
+    """
+    if not isinstance(raw, dict):
+        return {}
+    for key in raw:
+        if key not in MATCH_KEYS:
+            print(f"Ignoring unknown rule condition {key!r}")
+    match = {}
+    for key in MATCH_KEYS:
+        if key not in raw:
+            continue
+        value = raw[key]
+        try:
+            if key in ("name", "path"):
+                value = [value] if isinstance(value, str) else [str(v) for v in value]
+            elif key == "regex":
+                re.compile(value)
+            elif key.endswith("_size"):
+                parse_size(value)
+            else:
+                parse_age(value)
+        except (TypeError, ValueError, re.error) as e:
+            print(f"Ignoring rule condition {key}={value!r}: {e}")
+            continue
+        match[key] = value
+    return match
+
+
+def parse_conditions(text: str) -> dict:
+    """
+    Parse the condition language used in the rule editor into a "match" object.
+    Space-separated terms, all of which must hold:
+        name:IMG_*      filename glob (repeat for alternatives)
+        regex:^inv-\\d+  regular expression searched in the filename
+        path:~/Scans    only files from below this folder (repeatable)
+        size>10M  size<1G       file size bounds
+        age>30d   age<2h        time since last modification
+    Raises ValueError on unknown terms.
+    """
+    lexer = shlex.shlex(text, posix=True)
+    lexer.whitespace_split = True
+    lexer.escape = ""       # keep backslashes for regexes; quote terms with spaces instead
+    match = {}
+    for term in lexer:
+        m = re.fullmatch(r"(size|age)([<>])(.+)", term)
+        if m:
+            field, op, value = m.groups()
+            if field == "size":
+                parse_size(value)
+                match["min_size" if op == ">" else "max_size"] = value
+            else:
+                parse_age(value)
+                match["older_than" if op == ">" else "newer_than"] = value
+            continue
+        key, sep, value = term.partition(":")
+        if not sep or key not in ("name", "regex", "path") or not value:
+            raise ValueError(f"Unknown condition: {term}")
+        if key == "regex":
+            re.compile(value)
+            match["regex"] = value
+        else:
+            match.setdefault(key, []).append(os.path.expanduser(value) if key == "path" else value)
+    return match
+
+
+def format_conditions(match: Optional[dict]) -> str:
+    """Inverse of parse_conditions, for showing and editing a rule."""
+    if not match:
+        return ""
+    terms = [f"name:{g}" for g in match.get("name", [])]
+    if match.get("regex"):
+        terms.append(f"regex:{match['regex']}")
+    terms += [f"path:{p}" for p in match.get("path", [])]
+    for key, prefix in (("min_size", "size>"), ("max_size", "size<"),
+                        ("older_than", "age>"), ("newer_than", "age<")):
+        if key in match:
+            terms.append(f"{prefix}{match[key]}")
+    return " ".join(shlex.quote(t) for t in terms)
+
+
+class _Conditions:
+    """One rule's "match" object compiled into the cheapest checks possible."""
+    __slots__ = ("name_re", "regex", "prefixes", "min_size", "max_size", "older_than", "newer_than",
+                 "needs_stat")
+
+    def __init__(self, match: dict):
+        globs = match.get("name") or []
+        # All of a rule's globs become one case-insensitive alternation
+        self.name_re = re.compile("|".join(f"(?i:{fnmatch.translate(g)})" for g in globs)) if globs else None
+        self.regex = re.compile(match["regex"]) if match.get("regex") else None
+        self.prefixes = tuple(os.path.join(os.path.normcase(os.path.abspath(p)), "")
+                              for p in match.get("path") or [])
+        self.min_size = parse_size(match["min_size"]) if "min_size" in match else None
+        self.max_size = parse_size(match["max_size"]) if "max_size" in match else None
+        self.older_than = parse_age(match["older_than"]) if "older_than" in match else None
+        self.newer_than = parse_age(match["newer_than"]) if "newer_than" in match else None
+        self.needs_stat = any(v is not None for v in (self.min_size, self.max_size,
+                                                       self.older_than, self.newer_than))
+
+    def test(self, entry: Path, stat_of) -> bool:
+        """Name checks first; stat only when a size/age condition is reached."""
+        name = entry.name
+        if self.name_re is not None and not self.name_re.match(name):
+            return False
+        if self.regex is not None and not self.regex.search(name):
+            return False
+        if self.prefixes and not os.path.normcase(os.path.abspath(entry)).startswith(self.prefixes):
+            return False
+        if not self.needs_stat:
+            return True
+        st = stat_of()
+        if st is None:
+            return False
+        if self.min_size is not None and st.st_size < self.min_size:
+            return False
+        if self.max_size is not None and st.st_size > self.max_size:
+            return False
+        age = time.time() - st.st_mtime
+        if self.older_than is not None and age < self.older_than:
+            return False
+        if self.newer_than is not None and age > self.newer_than:
+            return False
+        return True
+
+
+class RuleMatcher:
+    """
+    All folder rules compiled into one lookup structure.
+    Every extension maps to the short, ordered list of rules that could
+    claim it (rules listing it plus rules with conditions but no
+    extensions), cut off after the first unconditional rule since nothing
+    after it can win. Plain extension rules therefore stay a dict lookup,
+    and conditions only run for the few candidates left; a file is
+    stat'ed at most once, and only when a size/age condition is reached.
+    First match wins, as in the rule list.
+    """
+    def __init__(self, rules: list):
+        compiled = []
+        for rule in rules or []:
+            match = rule.get("match")
+            conditions = _Conditions(match) if match else None
+            exts = rule.get("exts") or set()
+            if not exts and conditions is None:
+                continue        # no extensions and no conditions: matches nothing
+            compiled.append((exts, rule, conditions))
+
+        self._any = self._cut([(rule, c) for exts, rule, c in compiled if not exts])
+        self._by_ext = {}
+        for ext in {ext for exts, _, _ in compiled for ext in exts}:
+            self._by_ext[ext] = self._cut([(rule, c) for exts, rule, c in compiled if not exts or ext in exts])
+
+    @staticmethod
+    def _cut(candidates: list) -> tuple:
+        for i, (_, conditions) in enumerate(candidates):
+            if conditions is None:
+                return tuple(candidates[:i + 1])
+        return tuple(candidates)
+
+    def match(self, ext: str, entry: Optional[Path] = None) -> Optional[dict]:
+        """
+        First rule for a file with extension `ext` (e.g. '.JPG' or 'jpg').
+        Without `entry`, rules with conditions cannot be checked and are passed over.
+        """
+        ext = (ext or "").lower()
+        if ext and not ext.startswith('.'):
+            ext = '.' + ext
+        candidates = self._by_ext.get(ext, self._any)
+        if not candidates:
+            return None
+
+        st = []
+        def stat_of():
+            if not st:
+                try:
+                    st.append(os.stat(entry))
+                except OSError:
+                    st.append(None)
+            return st[0]
+
+        for rule, conditions in candidates:
+            if conditions is None:
+                return rule
+            if entry is not None and conditions.test(entry, stat_of):
+                return rule
+        return None
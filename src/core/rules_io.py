@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Optional
+
+from src.core.destinations import validate_template
+from src.core.rule_engine import normalize_match
+
+APP_NAME = "FileSor"
+RULES_FILENAME = "folder_rules.json"
+
+
+def default_rules_path() -> Path:
+    """
+    Return the rules file the GUI uses, without importing Qt.
+    Mirrors QStandardPaths.AppDataLocation for an application named
+    'FileSor' with no organization name.
+    """
+    if sys.platform.startswith("win"):
+        base = Path(os.environ.get("APPDATA") or Path.home() / "AppData" / "Roaming")
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Application Support"
+    else:
+        base = Path(os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share")
+    return base / APP_NAME / RULES_FILENAME
+
+
+def _read_json(p: Path):
+    raw_text = p.read_text(encoding="utf-8").strip()
+    if not raw_text:
+        raise ValueError("rules file is empty")
+    return json.loads(raw_text)
+
+
+def read_rules_file(path: Path):
+    """
+    Read the raw JSON rules, falling back to the '.bak' copy written by
+    save_rules. Returns None if neither file could be read.
+    """
+    bak = path.with_suffix(path.suffix + ".bak")
+
+    raw = None
+    if path.exists():
+        try:
+            raw = _read_json(path)
+        except Exception as e:
+            print(f"Failed to load rules from {path}: {e}")
+
+    if raw is None and bak.exists():
+        try:
+            raw = _read_json(bak)
+            print("Recovered rules from backup.")
+        except Exception as e:
+            print(f"Failed to load rules from {bak}: {e}")
+    return raw
+
+
+def parse_rules(raw) -> list:
+    """
+    Convert raw JSON into rule dicts with 'exts' as sets.
+    The optional 'match' object (name globs, regex, path prefixes, size and
+    age bounds; see rule_engine) and 'template' (per-file subfolders; see
+    destinations) are kept only on rules that have them, so files written
+    by older versions load unchanged.
+    """
+    if not isinstance(raw, list):
+        print(f"Rules file has wrong format (expected list, got {type(raw).__name__})")
+        return []
+
+    rules = []
+    for r in raw:
+        if not isinstance(r, dict):
+            continue
+        rule = {
+            "name": r.get("name", ""),
+            "path": r.get("path", ""),
+            "exts": set(r.get("exts", [])),
+        }
+        match = normalize_match(r.get("match"))
+        if match:
+            rule["match"] = match
+        if r.get("template"):
+            try:
+                rule["template"] = validate_template(str(r["template"]))
+            except ValueError as e:
+                print(f"Ignoring template of rule {rule['name']!r}: {e}")
+        rules.append(rule)
+    return rules
+
+
+def load_rules(path: Path) -> Optional[list]:
+    """Load and parse a rules file; None if no readable file exists."""
+    raw = read_rules_file(path)
+    if raw is None:
+        return None
+    return parse_rules(raw)
+
+
+def serialize_rules(rules: list) -> list:
+    """Build the JSON-serializable form of folder_rules."""
+    data = []
+    for r in rules:
+        item = {
+            "name": r.get("name", ""),
+            "path": r.get("path", ""),
+            "exts": sorted(list(r.get("exts", set()))),
+        }
+        if r.get("match"):
+            item["match"] = r["match"]
+        if r.get("template"):
+            item["template"] = r["template"]
+        data.append(item)
+    return data
+
+
+def save_rules(path: Path, rules: list) -> None:
+    """Save rules to disk as JSON (safe/atomic), keeping a '.bak' of the previous file."""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    bak = path.with_suffix(path.suffix + ".bak")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    data = serialize_rules(rules)
+
+    # Backup existing file
+    if path.exists():
+        shutil.copy2(path, bak)
+
+    # Atomic write: write temp, then replace
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    tmp.replace(path)
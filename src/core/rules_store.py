@@ -0,0 +1,206 @@
+import json
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from src.core import rules_io
+
+STORE_FILENAME = "rules.db"     # Lives next to folder_rules.json, which it replaces
+
+# Each entry upgrades the schema by one version (PRAGMA user_version)
+MIGRATIONS = (
+    """
+    CREATE TABLE rules (
+        id        INTEGER PRIMARY KEY,
+        position  INTEGER NOT NULL,
+        name      TEXT NOT NULL DEFAULT '',
+        path      TEXT NOT NULL DEFAULT '',
+        exts      TEXT NOT NULL DEFAULT '[]',
+        match     TEXT,
+        template  TEXT
+    );
+    CREATE INDEX rules_position ON rules (position);
+    CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+    """,
+)
+
+
+def store_path_for(rules_path: Path) -> Path:
+    """Where the rules database lives for a given (legacy) rules file path."""
+    return rules_path.parent / STORE_FILENAME
+
+
+class RulesStore:
+    """
+    SQLite-backed folder rules. Every add/edit/remove is a single-row
+    upsert or delete instead of a rewrite of the whole file, and loading
+    does not re-parse JSON. Rules read from the store carry their row id
+    under 'id'. JSON stays the exchange format: see import_json/export_json.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+    def _migrate(self) -> None:
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version > len(MIGRATIONS):
+            raise RuntimeError(f"{self.path} was written by a newer version (schema {version})")
+        for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            with self._db:
+                self._db.executescript(script)
+                self._db.execute(f"PRAGMA user_version = {number}")
+
+    @property
+    def schema_version(self) -> int:
+        return self._db.execute("PRAGMA user_version").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+    # ============================
+    # Rules
+    # ============================
+
+    def load(self) -> list:
+        """All rules in list order, as dicts like rules_io.parse_rules returns."""
+        rules = []
+        for row_id, name, path, exts, match, template in self._db.execute(
+                "SELECT id, name, path, exts, match, template FROM rules ORDER BY position, id"):
+            rule = {"id": row_id, "name": name, "path": path, "exts": set(json.loads(exts))}
+            if match:
+                rule["match"] = json.loads(match)
+            if template:
+                rule["template"] = template
+            rules.append(rule)
+        return rules
+
+    @staticmethod
+    def _row(rule: dict) -> tuple:
+        return (rule.get("name", ""), rule.get("path", ""), json.dumps(sorted(rule.get("exts", set()))),
+                json.dumps(rule["match"]) if rule.get("match") else None, rule.get("template") or None)
+
+    def upsert(self, rule: dict) -> None:
+        """Insert a new rule at the end of the list, or update it in place; sets rule['id']."""
+        with self._db:
+            if rule.get("id") is not None:
+                cur = self._db.execute("UPDATE rules SET name=?, path=?, exts=?, match=?, template=? WHERE id=?",
+                                       self._row(rule) + (rule["id"],))
+                if cur.rowcount:
+                    return
+            cur = self._db.execute(
+                "INSERT INTO rules (position, name, path, exts, match, template) "
+                "VALUES ((SELECT COALESCE(MAX(position), -1) + 1 FROM rules), ?, ?, ?, ?, ?)",
+                self._row(rule))
+            rule["id"] = cur.lastrowid
+
+    def delete(self, rule: dict) -> None:
+        if rule.get("id") is None:
+            return
+        with self._db:
+            self._db.execute("DELETE FROM rules WHERE id=?", (rule["id"],))
+
+    def replace_all(self, rules: list) -> None:
+        """Store exactly `rules`, in this order, in one transaction; sets every rule's 'id'."""
+        with self._db:
+            self._db.execute("DELETE FROM rules")
+            for position, rule in enumerate(rules):
+                cur = self._db.execute(
+                    "INSERT INTO rules (position, name, path, exts, match, template) VALUES (?, ?, ?, ?, ?, ?)",
+                    (position,) + self._row(rule))
+                rule["id"] = cur.lastrowid
+
+    # ============================
+    # JSON import / export / migration
+    # ============================
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def migrate_from_json(self, json_path: Path) -> bool:
+        """
+        One-time import of the legacy folder_rules.json (or its .bak) into an
+        empty store. The JSON file is left in place. Returns True if rules
+        were imported.
+        """
+        if self.get_meta("migrated_json") is not None:
+            return False
+        imported = False
+        empty = self._db.execute("SELECT COUNT(*) FROM rules").fetchone()[0] == 0
+        if empty:
+            rules = rules_io.load_rules(json_path)
+            if rules:
+                self.replace_all(rules)
+                imported = True
+        self.set_meta("migrated_json", str(json_path))
+        return imported
+
+    @staticmethod
+    def import_json(path: Path) -> list:
+        """Read rules from a shared JSON file (same format as folder_rules.json)."""
+        raw = rules_io.read_rules_file(path)
+        return rules_io.parse_rules(raw) if raw is not None else []
+
+    @staticmethod
+    def export_json(path: Path, rules: list) -> None:
+        """Write rules as JSON for sharing; row ids are not exported."""
+        path.write_text(json.dumps(rules_io.serialize_rules(rules), indent=2), encoding="utf-8")
+
+
+def _same_path(a: Path, b: Path) -> bool:
+    """True if both name the same file, however they are spelled (relative, symlinks, '~')."""
+    try:
+        return a.expanduser().resolve() == b.expanduser().resolve()
+    except OSError:
+        return False
+
+
+def _store_supersedes(json_path: Path, store_path: Path) -> bool:
+    """
+    Whether the rules.db next to a folder_rules.json holds the current rules:
+    the GUI stops writing the JSON once it migrated it, so a store at least
+    as new as the JSON (or without the JSON) wins.
+    """
+    if json_path.name != rules_io.RULES_FILENAME:
+        return False            # an exported or shared rules file, not the app's own
+    try:
+        store_mtime = store_path.stat().st_mtime
+    except OSError:
+        return False
+    try:
+        return store_mtime >= json_path.stat().st_mtime
+    except FileNotFoundError:
+        return True
+    except OSError:
+        return False
+
+
+def load_rules_from(path: Path) -> Optional[list]:
+    """
+    Load rules for headless use from a rules database or a JSON file.
+    For the app's folder_rules.json (by any spelling of its path) the
+    database next to it wins once it exists, as it does for any
+    folder_rules.json whose sibling rules.db is newer.
+    """
+    path = path.expanduser()
+    if path.suffix == ".db":
+        if not path.exists():
+            return None
+        store = RulesStore(path)
+        try:
+            return store.load()
+        finally:
+            store.close()
+    store_path = store_path_for(path)
+    if store_path.exists() and (_same_path(path, rules_io.default_rules_path())
+                                or _store_supersedes(path, store_path)):
+        return load_rules_from(store_path)
+    return rules_io.load_rules(path)
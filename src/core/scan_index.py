@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from src.core import rules_io
+
+SCAN_INDEX_FILENAME = "scan_index.json"     # Created next to folder_rules.json
+RACY_MTIME_NS = 2 * 10 ** 9                 # Folders changed this recently are never trusted
+
+
+def scan_index_for(rules_path: Path) -> Path:
+    """Where the incremental scan index lives for a given rules file."""
+    return rules_path.parent / SCAN_INDEX_FILENAME
+
+
+def rules_version(rules: list, extra: str = "") -> Optional[str]:
+    """
+    Hash of everything a 'no rule matched' verdict depends on: the rules
+    plus `extra` (scan options, sniffing mode). None when a rule has an age
+    condition, because those verdicts change with time alone.
+    """
+    data = rules_io.serialize_rules(rules)
+    if any(k in r.get("match", {}) for r in data for k in ("older_than", "newer_than")):
+        return None
+    text = json.dumps(data, sort_keys=True) + "\0" + extra
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ScanIndex:
+    """
+    Persistent snapshot of source folders from earlier runs, so repeat sorts
+    only look at what changed.
+    Per folder it keeps the files no rule matched (name -> [size, mtime_ns])
+    and, when every file in it was left alone, the folder's mtime and
+    subfolders. scan_files consults it: an unchanged folder is not listed at
+    all, and known-unmatched files in a changed folder are not yielded
+    again. The whole index is dropped when the rules version changes.
+    `check_stat` re-validates skipped files by size/mtime; it is needed
+    when verdicts depend on content (sniffing, size conditions). Editing a
+    file in place does not touch its folder's mtime, so with `check_stat`
+    folders are always listed and never recorded as unchanged.
+    Several source folders may be scanned into one index concurrently.
+    """
+    def __init__(self, path: Path, version: str, check_stat: bool = True):
+        self.path = path
+        self.version = version
+        self.check_stat = check_stat
+        self.reused = 0             # files not looked at again this run
+        self._lock = threading.Lock()
+        self._dirs = self._load()   # folder -> {"m": mtime_ns or None, "s": {name: [size, mtime]}, "d": [subdirs]}
+        self._seen = {}             # folder -> [mtime_ns, listed at, files listed, subdirs, skipped]
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable scan index {self.path}: {e}")
+            return {}
+        if data.get("version") != self.version:
+            return {}
+        return data.get("dirs", {})
+
+    def unchanged_subdirs(self, dir_path: str, mtime_ns: int) -> Optional[list]:
+        """Subfolders of a folder that has not changed since it was left fully unmatched, else None."""
+        if self.check_stat:
+            return None     # the files themselves must be stat'ed again
+        record = self._dirs.get(dir_path)
+        if record is None or record.get("m") != mtime_ns:
+            return None
+        with self._lock:
+            self.reused += len(record.get("s", {}))
+        return record.get("d", [])
+
+    def begin_dir(self, dir_path: str, mtime_ns: int) -> None:
+        self._seen[dir_path] = [mtime_ns, time.time_ns(), 0, [], {}]
+
+    def add_subdir(self, dir_path: str, name: str) -> None:
+        self._seen[dir_path][3].append(name)
+
+    def known_skipped(self, dir_path: str, entry: os.DirEntry) -> bool:
+        """True if `entry` was unmatched last time and has not changed since."""
+        seen = self._seen[dir_path]
+        seen[2] += 1
+        record = self._dirs.get(dir_path)
+        stamp = record.get("s", {}).get(entry.name) if record else None
+        if stamp is None:
+            return False
+        if self.check_stat:
+            st = entry.stat()
+            if stamp != [st.st_size, st.st_mtime_ns]:
+                return False
+        with self._lock:
+            seen[4][entry.name] = stamp
+            self.reused += 1
+        return True
+
+    def record_skipped(self, entry: Path) -> None:
+        """Engine callback for a file no rule matched."""
+        seen = self._seen.get(str(entry.parent))
+        if seen is None:
+            return
+        stamp = [0, 0]
+        if self.check_stat:
+            try:
+                st = entry.stat()
+            except OSError:
+                return
+            stamp = [st.st_size, st.st_mtime_ns]
+        with self._lock:
+            seen[4][entry.name] = stamp
+
+    def save(self) -> None:
+        """
+        Fold this run's folders into the index and write it (atomic replace).
+        Only call after a complete run: a folder is marked unchanged only if
+        every file listed in it ended up unmatched.
+        """
+        for dir_path, (mtime_ns, listed_at, listed, subdirs, skipped) in self._seen.items():
+            # A folder modified within RACY_MTIME_NS of being listed may have
+            # changed again without its mtime moving (coarse timestamps)
+            clean = (not self.check_stat and mtime_ns is not None and len(skipped) == listed
+                     and listed_at - mtime_ns > RACY_MTIME_NS)
+            self._dirs[dir_path] = {"m": mtime_ns if clean else None, "s": skipped, "d": subdirs}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"version": self.version, "dirs": self._dirs}), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Could not save scan index {self.path}: {e}")
@@ -0,0 +1,210 @@
+import fnmatch
+import os
+import queue
+import re
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+
+class ScanOptions:
+    """
+    How a source directory is walked.
+    recursive: descend into subfolders (off by default, top level only).
+    max_depth: deepest subfolder level to enter when recursive; None = no limit.
+    exclude: glob patterns matched against entry names and root-relative
+             paths, e.g. ['*.part', '.git', 'cache/*']. Excluded folders are
+             not descended into.
+    """
+    def __init__(self, recursive: bool = False, max_depth: Optional[int] = None,
+                 exclude: Optional[Iterable[str]] = None):
+        self.recursive = recursive
+        self.max_depth = max_depth
+        self.exclude = list(exclude or [])
+
+    def exclude_matcher(self):
+        """Compile all exclude globs into one regex match function (or None)."""
+        if not self.exclude:
+            return None
+        pattern = "|".join(fnmatch.translate(os.path.normcase(p)) for p in self.exclude)
+        return re.compile(pattern).match
+
+
+def scan_files(root: Path, options: Optional[ScanOptions] = None,
+               skip_dirs: Iterable[Path] = (), cancel: Optional[threading.Event] = None,
+               index=None) -> Iterator[Path]:
+    """
+    Stream the files under `root` using os.scandir.
+    File/dir checks use the type info cached on each DirEntry, so no extra
+    stat is issued per file on platforms that report it (Windows, most Linux
+    filesystems). Only pending subfolder paths are held in memory, so huge
+    directories are never materialized as a list.
+    `skip_dirs` are never descended into (e.g. destinations inside the source).
+    With a ScanIndex, folders unchanged since an earlier run are not listed
+    and files already known to match no rule are not yielded again.
+    """
+    options = options or ScanOptions()
+    excluded = options.exclude_matcher()
+    skip = {os.path.normcase(os.path.abspath(d)) for d in skip_dirs}
+    stack = [(str(root), "", 0)]
+
+    while stack:
+        dir_path, rel_dir, depth = stack.pop()
+        if index is not None:
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            subdirs = index.unchanged_subdirs(dir_path, mtime_ns) if mtime_ns is not None else None
+            if subdirs is not None:
+                if options.recursive and (options.max_depth is None or depth < options.max_depth):
+                    for name in subdirs:
+                        stack.append((os.path.join(dir_path, name), f"{rel_dir}/{name}" if rel_dir else name,
+                                      depth + 1))
+                continue
+            index.begin_dir(dir_path, mtime_ns)
+        try:
+            it = os.scandir(dir_path)
+        except OSError as e:
+            if dir_path == str(root):
+                raise
+            print(f"Skipping unreadable folder {dir_path}: {e}")
+            continue
+
+        with it:
+            for entry in it:
+                if cancel is not None and cancel.is_set():
+                    return
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if excluded and (excluded(os.path.normcase(entry.name)) or excluded(os.path.normcase(rel))):
+                    continue
+                try:
+                    if entry.is_file():
+                        if index is not None and index.known_skipped(dir_path, entry):
+                            continue
+                        yield Path(entry.path)
+                    elif options.recursive and entry.is_dir(follow_symlinks=False):
+                        if options.max_depth is not None and depth >= options.max_depth:
+                            continue
+                        if os.path.normcase(os.path.abspath(entry.path)) in skip:
+                            continue
+                        if index is not None:
+                            index.add_subdir(dir_path, entry.name)
+                        stack.append((entry.path, rel, depth + 1))
+                except OSError as e:
+                    print(f"Skipping {entry.path}: {e}")
+
+
+def merge_sources(dirs: Iterable[Path], files: Iterable[Path],
+                  options: Optional[ScanOptions] = None) -> tuple:
+    """
+    Collapse a batch of dropped folders and files into sources that never
+    overlap: repeated paths are dropped, as are folders inside another
+    dropped folder that a recursive scan already covers and files that a
+    dropped folder's scan will find anyway. Order is kept.
+    Returns (dirs, files, nested), where `nested` are dropped folders inside
+    another one that its depth-limited scan must not enter.
+    """
+    options = options or ScanOptions()
+    full_depth = options.recursive and options.max_depth is None
+
+    def key(p: Path) -> str:
+        return os.path.normcase(os.path.abspath(p))
+
+    kept_dirs, dir_keys = [], {}
+    for d in dirs:
+        k = key(d)
+        if k not in dir_keys:
+            dir_keys[k] = d
+            kept_dirs.append((k, d))
+
+    def parents(k: str) -> Iterator[str]:
+        parent = os.path.dirname(k)
+        while parent and parent != k:
+            yield parent
+            k, parent = parent, os.path.dirname(parent)
+
+    out_dirs, nested = [], []
+    for k, d in kept_dirs:
+        if any(p in dir_keys for p in parents(k)):
+            if full_depth:
+                continue            # the enclosing folder's scan finds everything in it
+            if options.recursive:
+                nested.append(d)
+        out_dirs.append(d)
+
+    out_files, file_keys = [], set()
+    for f in files:
+        k = key(f)
+        if k in file_keys or k in dir_keys:
+            continue
+        file_keys.add(k)
+        parent = os.path.dirname(k)
+        if parent in dir_keys or (full_depth and any(p in dir_keys for p in parents(parent))):
+            continue
+        out_files.append(f)
+    return out_dirs, out_files, nested
+
+
+def scan_many(roots: List[Path], options: Optional[ScanOptions] = None,
+              skip_dirs: Iterable[Path] = (), cancel: Optional[threading.Event] = None,
+              index=None, workers: int = 4, buffer: int = 1024) -> Iterator[Path]:
+    """
+    Scan several source folders concurrently and merge their files into one
+    stream. Each root is walked by its own thread (up to `workers` at a
+    time) into a bounded queue, so a slow drive does not hold up the others
+    and memory stays flat however large the folders are. A root that
+    cannot be read is reported and skipped instead of failing the batch.
+    """
+    if len(roots) == 1:
+        yield from scan_files(roots[0], options, skip_dirs, cancel, index)
+        return
+
+    stop = threading.Event()
+    out = queue.Queue(maxsize=buffer)
+    pending = queue.Queue()
+    for root in roots:
+        pending.put(root)
+    done = object()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker():
+        try:
+            while not stop.is_set():
+                try:
+                    root = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    for f in scan_files(root, options, skip_dirs, cancel, index):
+                        if not put(f):
+                            return
+                except OSError as e:
+                    print(f"Skipping unreadable folder {root}: {e}")
+        finally:
+            put(done)
+
+    threads = [threading.Thread(target=worker, name="scan", daemon=True)
+               for _ in range(max(1, min(workers, len(roots))))]
+    for t in threads:
+        t.start()
+    running = len(threads)
+    try:
+        while running:
+            item = out.get()
+            if item is done:
+                running -= 1
+            else:
+                yield item
+    finally:
+        stop.set()          # consumer stopped early (cancel, error): release the scanners
+        for t in threads:
+            t.join()
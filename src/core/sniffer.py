@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+SNIFF_CACHE_FILENAME = "sniff_cache.json"     # Created next to folder_rules.json
+SNIFF_BYTES = 64                              # Enough for every signature below
+MAX_CACHE_ENTRIES = 200000
+
+# (offset, magic bytes, extension), checked in order
+SIGNATURES = (
+    (0, b"\xff\xd8\xff", ".jpg"),
+    (0, b"\x89PNG\r\n\x1a\n", ".png"),
+    (0, b"GIF87a", ".gif"),
+    (0, b"GIF89a", ".gif"),
+    (0, b"%PDF-", ".pdf"),
+    (0, b"II*\x00", ".tif"),
+    (0, b"MM\x00*", ".tif"),
+    (0, b"8BPS", ".psd"),
+    (0, b"\x00\x00\x01\x00", ".ico"),
+    (0, b"PK\x03\x04", ".zip"),
+    (0, b"\x1f\x8b", ".gz"),
+    (0, b"7z\xbc\xaf\x27\x1c", ".7z"),
+    (0, b"Rar!\x1a\x07", ".rar"),
+    (0, b"BZh", ".bz2"),
+    (0, b"\xfd7zXZ\x00", ".xz"),
+    (0, b"fLaC", ".flac"),
+    (0, b"OggS", ".ogg"),
+    (0, b"ID3", ".mp3"),
+    (0, b"\x1aE\xdf\xa3", ".mkv"),
+    (0, b"SQLite format 3\x00", ".sqlite"),
+    (0, b"{\\rtf", ".rtf"),
+    (0, b"%!PS", ".ps"),
+    (0, b"MZ", ".exe"),
+)
+
+RIFF_TYPES = {b"WEBP": ".webp", b"WAVE": ".wav", b"AVI ": ".avi"}
+FTYP_BRANDS = {b"qt  ": ".mov", b"heic": ".heic", b"heix": ".heic", b"mif1": ".heic",
+               b"M4A ": ".m4a", b"3gp4": ".3gp", b"3gp5": ".3gp"}
+
+# Extensions that legitimately carry another format's signature; a file
+# labelled like this is not "mislabelled" when it sniffs as the key.
+COMPATIBLE_EXTS = {
+    ".jpg": {".jpeg", ".jpe", ".jfif"},
+    ".tif": {".tiff", ".dng", ".nef", ".cr2", ".arw"},
+    ".zip": {".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp", ".epub", ".jar", ".apk", ".cbz", ".xpi"},
+    ".gz": {".tgz"},
+    ".mp4": {".m4v", ".m4a", ".mov", ".3gp"},
+    ".mkv": {".webm", ".mka"},
+    ".ogg": {".oga", ".ogv", ".opus"},
+    ".exe": {".dll", ".sys", ".scr"},
+    ".sqlite": {".db", ".sqlite3"},
+}
+
+
+def sniff_cache_for(rules_path: Path) -> Path:
+    """Where the sniffer cache lives for a given rules file."""
+    return rules_path.parent / SNIFF_CACHE_FILENAME
+
+
+def sniff_bytes(head: bytes) -> Optional[str]:
+    """Infer an extension (e.g. '.png') from the first bytes of a file, or None."""
+    if head[:4] == b"RIFF":
+        return RIFF_TYPES.get(head[8:12])
+    if head[4:8] == b"ftyp":
+        return FTYP_BRANDS.get(head[8:12], ".mp4")
+    if head[:2] == b"\xff\xfb" or head[:2] == b"\xff\xf3":
+        return ".mp3"
+    for offset, magic, ext in SIGNATURES:
+        if head.startswith(magic, offset):
+            return ext
+    return None
+
+
+class ContentSniffer:
+    """
+    Optional magic-byte stage for files whose extension matches no rule
+    (mode 'unmatched') or may be wrong (mode 'all').
+    Each file costs one small read; results are cached on disk keyed by
+    path and validated against (size, mtime, inode), so repeat runs over the
+    same tree only stat. Sniffing runs on its own bounded pool a few files
+    ahead of the movers.
+    """
+    MODES = ("unmatched", "all")
+
+    def __init__(self, cache_path: Optional[Path] = None, mode: str = "unmatched", workers: int = 2):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown sniff mode: {mode}")
+        self.cache_path = cache_path
+        self.mode = mode
+        self.workers = max(1, int(workers))
+        self._lock = threading.Lock()
+        self._cache = None      # str(path) -> [size, mtime_ns, inode, ext], loaded lazily
+        self._dirty = False
+
+    def _entries(self) -> dict:
+        if self._cache is None:
+            cache = {}
+            if self.cache_path is not None and self.cache_path.is_file():
+                try:
+                    with open(self.cache_path, encoding="utf-8") as f:
+                        cache = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Ignoring unreadable sniff cache {self.cache_path}: {e}")
+            self._cache = cache
+        return self._cache
+
+    def sniff(self, path: Path) -> Optional[str]:
+        """Extension for `path` from the cache or its first SNIFF_BYTES bytes."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = str(path)
+        with self._lock:
+            hit = self._entries().get(key)
+        if hit is not None and hit[:3] == [st.st_size, st.st_mtime_ns, st.st_ino]:
+            return hit[3] or None
+
+        try:
+            fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            try:
+                head = os.read(fd, SNIFF_BYTES)
+            finally:
+                os.close(fd)
+        except OSError:
+            return None
+        ext = sniff_bytes(head)
+
+        with self._lock:
+            cache = self._entries()
+            if len(cache) >= MAX_CACHE_ENTRIES:
+                del cache[next(iter(cache))]    # oldest entry
+            cache[key] = [st.st_size, st.st_mtime_ns, st.st_ino, ext or ""]
+            self._dirty = True
+        return ext
+
+    def save(self) -> None:
+        """Write the cache back if anything new was sniffed (atomic replace)."""
+        with self._lock:
+            if not self._dirty or self.cache_path is None:
+                return
+            data = json.dumps(self._cache)
+            self._dirty = False
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(".tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"Could not save sniff cache {self.cache_path}: {e}")
+
+    def _resolve(self, entry: Path, rule: Optional[dict], find_rule: Callable, metrics) -> Optional[dict]:
+        if metrics is None:
+            ext = self.sniff(entry)
+        else:
+            with metrics.phase("sniff"):
+                ext = self.sniff(entry)
+        suffix = entry.suffix.lower()
+        if ext and ext != suffix and suffix not in COMPATIBLE_EXTS.get(ext, ()):
+            return find_rule(ext, entry) or rule
+        return rule
+
+    def classify(self, files: Iterable[Path], find_rule: Callable, metrics=None):
+        """
+        Yield (file, rule) in input order. Files that need sniffing are read
+        on the pool, at most `workers * 4` ahead of the consumer.
+        """
+        window = deque()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="filesor-sniff") as pool:
+            for entry in files:
+                rule = find_rule(entry.suffix, entry)
+                if rule is None or self.mode == "all":
+                    window.append((entry, pool.submit(self._resolve, entry, rule, find_rule, metrics)))
+                else:
+                    window.append((entry, rule))
+                while len(window) > self.workers * 4 or (window and self._ready(window[0][1])):
+                    yield self._pop(window)
+            while window:
+                yield self._pop(window)
+
+    @staticmethod
+    def _ready(rule) -> bool:
+        return not isinstance(rule, Future) or rule.done()
+
+    @staticmethod
+    def _pop(window: deque) -> tuple:
+        entry, rule = window.popleft()
+        return entry, rule.result() if isinstance(rule, Future) else rule
+
+
+def classify_files(files: Iterable[Path], find_rule: Callable, sniffer: Optional[ContentSniffer] = None,
+                   metrics=None):
+    """Yield (file, rule or None), by extension and, with a sniffer, by content."""
+    if sniffer is not None:
+        yield from sniffer.classify(files, find_rule, metrics)
+        return
+    for entry in files:
+        if metrics is None:
+            yield entry, find_rule(entry.suffix, entry)
+        else:
+            with metrics.phase("match"):
+                rule = find_rule(entry.suffix, entry)
+            yield entry, rule
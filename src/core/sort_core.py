@@ -0,0 +1,344 @@
+import json
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+from src.core import rules_io
+from src.core.rule_engine import RuleMatcher
+
+if TYPE_CHECKING:
+    from src.core.dedupe import Deduplicator
+    from src.core.fs_ops import CopyOptions
+    from src.core.journal import MoveJournal
+    from src.core.planner import SortPlan
+    from src.core.scan_index import ScanIndex
+    from src.core.scanner import ScanOptions
+    from src.core.sniffer import ContentSniffer
+
+# Everything past rule matching (scanner, move engine, journal, scan index,
+# device limits) is imported where a job is created or run, so building the
+# main window does not load it.
+
+
+class SortJob:
+    """
+    One sort request: any mix of source directories and loose files.
+    Overlapping sources are merged (see merge_sources) and several folders
+    are scanned concurrently into a single pipeline, so a batch drop is one
+    run with one set of totals.
+    `find_rule` is a rule lookup snapshotted when the job was created, so
+    edits made in the UI while the job runs do not race with the worker.
+    With `dry_run` the job only builds a SortPlan; a job created with `plan`
+    executes that plan instead of scanning.
+    When `journal_dir` is set every completed move is journaled so the run
+    can be resumed or undone; `resume_path`/`done` continue an earlier
+    journal, skipping the sources it already recorded.
+    A `sniffer` also classifies files by content (see ContentSniffer), and
+    `dedupe` skips or hard-links files already present at the destination.
+    With a `scan_index` unchanged source folders and files that matched no
+    rule last time are not looked at again. `workers` is the number of
+    concurrent moves per device; `device_limits` overrides it by st_dev.
+    `copy_options` control chunking and verification of cross-device copies.
+    """
+    def __init__(self, find_rule: Callable, workers: int,
+                 dirs: Optional[List[Path]] = None, files: Optional[List[Path]] = None,
+                 scan_options: Optional["ScanOptions"] = None, skip_dirs: Optional[List[Path]] = None,
+                 fsync: bool = False, dry_run: bool = False, plan: Optional["SortPlan"] = None,
+                 rules: Optional[list] = None, journal_dir: Optional[Path] = None,
+                 resume_path: Optional[Path] = None, done: Optional[set] = None,
+                 metrics_hooks: Optional[list] = None, sniffer: Optional["ContentSniffer"] = None,
+                 dedupe: Optional["Deduplicator"] = None, scan_index: Optional["ScanIndex"] = None,
+                 device_limits: Optional[dict] = None, copy_options: Optional["CopyOptions"] = None,
+                 on_result: Optional[Callable] = None):
+        from src.core.scanner import ScanOptions, merge_sources
+
+        self.find_rule = find_rule
+        self.workers = workers
+        self.scan_options = scan_options or ScanOptions()
+        self.dirs, self.files, nested = merge_sources(dirs or [], files or [], self.scan_options)
+        self.skip_dirs = list(skip_dirs or []) + nested    # destinations and separately scanned sources
+        self.fsync = fsync
+        self.dry_run = dry_run
+        self.plan = plan
+        self.rules = rules or []                  # serialized snapshot, stored in the journal
+        self.journal_dir = journal_dir
+        self.resume_path = resume_path
+        self.done = done or set()                 # sources already moved by the resumed run
+        self.metrics_hooks = list(metrics_hooks or [])
+        self.sniffer = sniffer
+        self.dedupe = dedupe
+        self.scan_index = scan_index
+        self.device_limits = device_limits or {}    # st_dev -> concurrent moves (default: workers)
+        self.copy_options = copy_options          # None = MoveEngine's defaults
+        self.on_result = on_result                # per-file callback, see MoveEngine.on_result
+        self.cancel = threading.Event()
+
+    def iter_files(self):
+        """Yield every file this job should sort, scanning directories lazily."""
+        from src.core.scanner import scan_many
+
+        for f in self.files:
+            if self.cancel.is_set():
+                return
+            if f.is_file() and str(f) not in self.done:
+                yield f
+        for f in scan_many(self.dirs, self.scan_options, self.skip_dirs, self.cancel, self.scan_index,
+                           workers=self.workers):
+            if not self.done or str(f) not in self.done:
+                yield f
+
+    def _open_journal(self) -> Optional["MoveJournal"]:
+        from src.core.journal import MoveJournal
+
+        if self.resume_path is not None:
+            journal = MoveJournal(self.resume_path)
+            journal.moves = len(self.done)
+            journal.write_record({"type": "resume", "done": len(self.done)})
+            return journal
+        if self.journal_dir is None:
+            return None
+        options = self.scan_options
+        header = {
+            "dirs": [str(d) for d in self.dirs],
+            "files": [str(f) for f in self.files],
+            "scan": {"recursive": options.recursive, "max_depth": options.max_depth, "exclude": options.exclude},
+            "rules": self.rules,
+        }
+        return MoveJournal.start(self.journal_dir, header)
+
+    def run(self, on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Sort the job's files and return the engine totals.
+        Dry runs return the plan summary with the SortPlan under "plan".
+        """
+        try:
+            if self.dry_run:
+                from src.core.planner import build_plan
+                plan = build_plan(self.iter_files(), self.find_rule, self.cancel, on_progress,
+                                  sniffer=self.sniffer)
+                plan.dirs, plan.files = self.dirs, self.files
+                summary = plan.summary()
+                summary["plan"] = plan
+                return summary
+            totals, journal = self._execute(on_progress)
+        finally:
+            for cache in (self.sniffer, self.dedupe):
+                if cache is not None:
+                    cache.save()
+        totals["sources"] = len(self.dirs) + len(self.files)
+        if journal is not None:
+            journal.close("cancelled" if totals["cancelled"] else "complete")
+            totals["journal"] = str(journal.path)
+            from src.core.journal import prune_journals
+            prune_journals(journal.path.parent)
+        if self.scan_index is not None:
+            # Files the index let us skip still count as unmatched for the summary
+            totals["unchanged"] = self.scan_index.reused
+            totals["scanned"] += self.scan_index.reused
+            totals["skipped"] += self.scan_index.reused
+            if not totals["cancelled"]:
+                self.scan_index.save()
+        return totals
+
+    def _execute(self, on_progress: Optional[Callable[[dict], None]]) -> tuple:
+        from src.core.metrics import RunMetrics
+        from src.core.move_engine import MoveEngine
+
+        journal = self._open_journal()
+        engine = MoveEngine(self.find_rule, self.workers, fsync=self.fsync,
+                            on_moved=journal.record if journal else None,
+                            metrics=RunMetrics(self.metrics_hooks), sniffer=self.sniffer,
+                            dedupe=self.dedupe,
+                            on_skipped=self.scan_index.record_skipped if self.scan_index else None,
+                            device_limits=self.device_limits, copy_options=self.copy_options,
+                            on_result=self.on_result)
+        try:
+            if self.plan is not None:
+                totals = engine.run_plan(self.plan, cancel=self.cancel, on_progress=on_progress)
+            else:
+                totals = engine.run(self.iter_files(), cancel=self.cancel, on_progress=on_progress)
+        except BaseException:
+            if journal is not None:
+                journal.flush()     # no end record: the run stays resumable
+            raise
+        return totals, journal
+
+
+class UndoJob:
+    """Background job that reverts every move recorded in a journal."""
+    def __init__(self, path: Path, workers: int):
+        self.path = path
+        self.workers = workers
+        self.cancel = threading.Event()
+
+    def run(self, on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+        from src.core.journal import undo_run
+        return undo_run(self.path, self.workers, self.cancel, on_progress)
+
+
+class SortCore:
+    """
+    Qt-free sorting core: folder rules, the compiled rule index and job
+    creation. FileLogic builds the GUI on top of it; the headless CLI uses it
+    directly so it never pays the PySide6 import cost.
+    """
+    def __init__(self):
+
+        self.folder_rules: Optional[list] = None    # Will be set by UIHandler / the CLI
+        self._rule_index: Optional[RuleMatcher] = None  # compiled rules, built lazily
+        self.move_workers = 4                       # Parallel moves per device per sort run
+        self._scan_options: Optional["ScanOptions"] = None  # created on first use, see scan_options
+        self.fsync_copies = False                   # fsync cross-device copies before unlinking
+        self.journal_dir: Optional[Path] = None     # Journal sort runs here (None = off)
+        self.metrics_hooks: list = []               # (event, payload) callables, see RunMetrics
+        self.content_sniffer: Optional["ContentSniffer"] = None     # Classify by magic bytes (None = off)
+        self.deduplicator: Optional["Deduplicator"] = None          # Skip/link identical files (None = off)
+        self.scan_index_path: Optional[Path] = None # Remember unmatched files here (None = off)
+        self.device_limits: dict = {}               # folder -> concurrent moves on its drive
+        self.copy_options: Optional["CopyOptions"] = None   # Cross-device copies (None = defaults)
+
+    @property
+    def scan_options(self) -> "ScanOptions":
+        """How sources are walked; top level only unless recursion is enabled."""
+        if self._scan_options is None:
+            from src.core.scanner import ScanOptions
+            self._scan_options = ScanOptions()
+        return self._scan_options
+
+    @scan_options.setter
+    def scan_options(self, options: "ScanOptions") -> None:
+        self._scan_options = options
+
+    def bind_folder_rules(self, folder_rules: list) -> None:
+        """
+        Bind the core to a folder_rules list.
+        Both will now reference the SAME list object.
+        """
+        self.folder_rules = folder_rules
+        self.invalidate_rule_index()
+
+    def invalidate_rule_index(self) -> None:
+        """Drop the compiled rule matcher; it is rebuilt on the next lookup."""
+        self._rule_index = None
+
+    def _build_rule_index(self) -> RuleMatcher:
+        """
+        Compile folder_rules into a single RuleMatcher.
+        Rules keep their order, so lookups keep the first-match-wins behaviour.
+        """
+        return RuleMatcher(self.folder_rules or [])
+
+    def rule_lookup(self) -> Callable:
+        """
+        Return a lookup function bound to the current compiled index.
+        The returned function keeps working on that snapshot even if the
+        rules are edited afterwards, so it is safe to hand to a worker thread.
+        """
+        matcher = self._rule_index
+        if matcher is None:
+            matcher = self._rule_index = self._build_rule_index()
+        return matcher.match
+
+    def make_job(self, dirs: Optional[List[Path]] = None, files: Optional[List[Path]] = None,
+                 dry_run: bool = False) -> SortJob:
+        """Create a SortJob bound to a snapshot of the current rules and settings."""
+        skip_dirs = [Path(rule['path']) for rule in self.folder_rules or []]
+        return SortJob(self.rule_lookup(), self.move_workers, dirs=dirs, files=files,
+                       scan_options=self.scan_options, skip_dirs=skip_dirs, fsync=self.fsync_copies,
+                       dry_run=dry_run, rules=rules_io.serialize_rules(self.folder_rules or []),
+                       journal_dir=self.journal_dir, metrics_hooks=self.metrics_hooks,
+                       sniffer=self.content_sniffer, dedupe=self.deduplicator,
+                       scan_index=self._open_scan_index() if dirs and not dry_run else None,
+                       device_limits=self._resolve_device_limits(), copy_options=self.copy_options)
+
+    def _resolve_device_limits(self) -> dict:
+        """device_limits keyed by st_dev; folders that do not exist (yet) are ignored."""
+        if not self.device_limits:
+            return {}
+        from src.core.device_scheduler import device_of
+
+        limits = {}
+        for folder, limit in self.device_limits.items():
+            dev = device_of(Path(folder))
+            if dev is not None:
+                limits[dev] = int(limit)
+        return limits
+
+    def _open_scan_index(self) -> Optional["ScanIndex"]:
+        """
+        Load the scan index for the current rules and settings, or None if
+        it is off or cannot be trusted (rules with age conditions).
+        """
+        if self.scan_index_path is None:
+            return None
+        from src.core.scan_index import ScanIndex, rules_version
+
+        # Size conditions and sniffing depend on file contents, so skipped
+        # files must be re-validated by size/mtime; name-only verdicts need no stat
+        check_stat = self.content_sniffer is not None or any(
+            "min_size" in r.get("match", {}) or "max_size" in r.get("match", {}) for r in self.folder_rules or [])
+        options = self.scan_options
+        extra = json.dumps([options.recursive, options.max_depth, options.exclude, check_stat,
+                            self.content_sniffer.mode if self.content_sniffer else None])
+        version = rules_version(self.folder_rules or [], extra)
+        return ScanIndex(self.scan_index_path, version, check_stat) if version else None
+
+    def make_plan_job(self, plan: "SortPlan") -> SortJob:
+        """Create a SortJob that executes a previously built SortPlan."""
+        return SortJob(self.rule_lookup(), self.move_workers, dirs=plan.dirs, files=plan.files,
+                       scan_options=self.scan_options, fsync=self.fsync_copies, plan=plan,
+                       rules=rules_io.serialize_rules(self.folder_rules or []), journal_dir=self.journal_dir,
+                       metrics_hooks=self.metrics_hooks, dedupe=self.deduplicator,
+                       device_limits=self._resolve_device_limits(), copy_options=self.copy_options)
+
+    # ============================
+    # Journaled runs: resume / undo
+    # ============================
+
+    def find_interrupted_run(self) -> Optional[Path]:
+        """Newest journal whose run never finished (crash, power loss, killed process)."""
+        from src.core.journal import list_runs
+
+        for path, info in reversed(list_runs(self.journal_dir) if self.journal_dir else []):
+            if info["status"] == "incomplete":
+                return path
+        return None
+
+    def find_undoable_run(self) -> Optional[Path]:
+        """Newest journal with moves that has not been undone yet."""
+        from src.core.journal import list_runs
+
+        for path, info in reversed(list_runs(self.journal_dir) if self.journal_dir else []):
+            if info["moves"] and info["status"] != "undone":
+                return path
+        return None
+
+    def make_resume_job(self, path: Path) -> SortJob:
+        """
+        Continue an interrupted run with the rules and options it started
+        with. Sources the journal already recorded are skipped, and new
+        moves are appended to the same journal.
+        """
+        from src.core.journal import read_journal
+        from src.core.scanner import ScanOptions
+
+        info = read_journal(path)
+        header = info["header"]
+        snapshot = SortCore()
+        snapshot.bind_folder_rules(rules_io.parse_rules(header.get("rules", [])))
+        scan = header.get("scan", {})
+        return SortJob(snapshot.rule_lookup(), self.move_workers,
+                       dirs=[Path(d) for d in header.get("dirs", [])],
+                       files=[Path(f) for f in header.get("files", [])],
+                       scan_options=ScanOptions(scan.get("recursive", False), scan.get("max_depth"),
+                                                scan.get("exclude")),
+                       skip_dirs=[Path(rule['path']) for rule in snapshot.folder_rules],
+                       fsync=self.fsync_copies, rules=header.get("rules", []),
+                       resume_path=path, done={src for src, _ in info["moves"]},
+                       metrics_hooks=self.metrics_hooks, sniffer=self.content_sniffer,
+                       dedupe=self.deduplicator, device_limits=self._resolve_device_limits(),
+                       copy_options=self.copy_options)
+
+    def make_undo_job(self, path: Path) -> UndoJob:
+        """Create a job that moves everything recorded in a journal back."""
+        return UndoJob(path, self.move_workers)
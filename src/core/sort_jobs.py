@@ -0,0 +1,108 @@
+import queue
+import threading
+from pathlib import Path
+from typing import Optional
+
+from PySide6.QtCore import QThread, Signal
+
+from src.core.sort_core import SortCore, SortJob
+
+
+class SortJobQueue(QThread):
+    """
+    Background thread that runs SortJobs one after another.
+    Drops made while a job is running are queued behind it; progress and
+    results are delivered to the GUI thread through Qt signals.
+    """
+    progress = Signal(dict)         # Totals snapshot of the running job
+    jobFinished = Signal(dict)      # Final totals of a finished or cancelled job
+    pendingChanged = Signal(int)    # Number of jobs waiting behind the running one
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._jobs = queue.Queue()
+        self._current: Optional[SortJob] = None
+        self._lock = threading.Lock()
+
+    def submit(self, job: SortJob) -> None:
+        """Queue a job; starts the worker thread on first use."""
+        self._jobs.put(job)
+        self.pendingChanged.emit(self.pending())
+        if not self.isRunning():
+            self.start()
+
+    def pending(self) -> int:
+        return self._jobs.qsize()
+
+    def is_busy(self) -> bool:
+        with self._lock:
+            return self._current is not None
+
+    def cancel_current(self) -> None:
+        """Ask the running job to stop; files already being moved still finish."""
+        with self._lock:
+            if self._current is not None:
+                self._current.cancel.set()
+
+    def cancel_all(self) -> None:
+        """Drop every queued job and cancel the running one."""
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:                 # keep a pending shutdown request
+                self._jobs.put(None)
+                break
+        self.pendingChanged.emit(self.pending())
+        self.cancel_current()
+
+    def stop(self) -> None:
+        """Cancel everything and wait for the worker thread to exit."""
+        self.cancel_all()
+        if self.isRunning():
+            self._jobs.put(None)
+            self.wait()
+
+    def run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            self.pendingChanged.emit(self.pending())
+            with self._lock:
+                self._current = job
+            try:
+                totals = job.run(self.progress.emit)
+            except Exception as e:
+                print(f"Sort job failed: {e}")
+                totals = {"scanned": 0, "moved": 0, "skipped": 0, "errors": 1, "bytes": 0, "duplicates": 0,
+                          "cancelled": False}
+            with self._lock:
+                self._current = None
+            self.jobFinished.emit(totals)
+
+
+class InterruptedRunScan(QThread):
+    """
+    Startup check for an interrupted journaled run, off the GUI thread:
+    old journals are pruned first, then the newest unfinished run (or None)
+    is delivered through `found`.
+    """
+    found = Signal(object)          # Path of the interrupted run, or None
+
+    def __init__(self, core: SortCore, parent=None):
+        super().__init__(parent)
+        self.core = core
+
+    def run(self):
+        from src.core.journal import prune_journals
+
+        path: Optional[Path] = None
+        try:
+            if self.core.journal_dir is not None:
+                prune_journals(self.core.journal_dir)
+            path = self.core.find_interrupted_run()
+        except Exception as e:
+            print(f"Could not check for interrupted sorts: {e}")
+        self.found.emit(path)
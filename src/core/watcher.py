@@ -0,0 +1,271 @@
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.core.scanner import scan_files
+from src.core.sort_core import SortCore
+
+
+class _InotifySource:
+    """
+    Linux inotify watch on a single folder, called through libc with ctypes
+    so no extra package is needed. read() returns the names of files that
+    were created, finished writing or moved in, or None after a queue
+    overflow (the caller should rescan).
+    """
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, path: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(str(path)), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {path}")
+
+    def read(self, timeout: float):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        names = []
+        offset = 0
+        while offset < len(data):
+            _wd, mask, _cookie, length = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                return None
+            if name and not mask & self.IN_ISDIR:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Sorts files as they arrive in a watched folder.
+    New files are detected through inotify where available (top level only)
+    or by polling with the os.scandir scanner. A file is handed to the move
+    engine once its size and mtime stayed unchanged for `settle` seconds, so
+    downloads still being written are left alone. Ready files go through a
+    queue to a mover thread that sorts them in batches of at most
+    `batch_size`, which keeps the time from arrival to move bounded.
+    Files whose move failed are handed back and retried after settling
+    again, up to RETRY_LIMIT times until they change.
+    """
+    PRUNE_INTERVAL = 60.0   # Seconds between clean-ups of the known-files table
+    RETRY_LIMIT = 5         # Failed moves of an unchanged file before it is left alone
+
+    def __init__(self, core: SortCore, source: Path, settle: float = 2.0, poll_interval: float = 1.0,
+                 batch_size: int = 500, use_inotify: bool = True, sort_existing: bool = False,
+                 on_batch: Optional[Callable[[dict], None]] = None):
+        self.core = core
+        self.source = Path(source)
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.use_inotify = use_inotify
+        self.sort_existing = sort_existing
+        self.on_batch = on_batch
+
+        self._ready = queue.Queue()
+        self._pending = {}      # path -> (size, mtime_ns, unchanged since, first seen)
+        self._known = {}        # path -> (size, mtime_ns) already queued or present at start
+        self._failed = queue.Queue()    # paths whose move failed, handed back by the mover
+        self._failures = {}     # path -> failed moves so far (watcher thread only)
+        self._stats_lock = threading.Lock()
+        self.stats = {"moved": 0, "skipped": 0, "errors": 0, "batches": 0,
+                      "last_latency": 0.0, "max_latency": 0.0, "mode": ""}
+
+    @property
+    def queue_depth(self) -> int:
+        """Files that are ready and waiting for the mover."""
+        return self._ready.qsize()
+
+    def snapshot(self) -> dict:
+        """Current counters plus queue depth and files still settling."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["queue_depth"] = self.queue_depth
+        stats["settling"] = len(self._pending)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Detection
+    # ------------------------------------------------------------------
+    def _open_source(self):
+        if not self.use_inotify or not sys.platform.startswith("linux") or self.core.scan_options.recursive:
+            return None
+        try:
+            return _InotifySource(self.source)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); falling back to polling.")
+            return None
+
+    def _rescan(self, now: float) -> None:
+        """
+        Full scandir pass: notice new or changed files that are not known yet,
+        and forget known files that have since disappeared (moved away).
+        """
+        skip_dirs = [Path(rule['path']) for rule in self.core.folder_rules or []]
+        seen = set()
+        for path in scan_files(self.source, self.core.scan_options, skip_dirs):
+            seen.add(str(path))
+            self._observe(path, now)
+        self._known = {key: sig for key, sig in self._known.items() if key in seen}
+        self._failures = {key: n for key, n in self._failures.items() if key in seen}
+
+    def _prune_known(self) -> None:
+        """Forget known files that no longer exist (inotify mode has no full scans)."""
+        self._known = {key: sig for key, sig in self._known.items() if os.path.exists(key)}
+        self._failures = {key: n for key, n in self._failures.items() if key in self._known}
+
+    def _retry_failed(self, now: float) -> None:
+        """Let files whose move failed settle and be queued again."""
+        while True:
+            try:
+                path = self._failed.get_nowait()
+            except queue.Empty:
+                return
+            key = str(path)
+            failures = self._failures.get(key, 0) + 1
+            if failures > self.RETRY_LIMIT:
+                continue            # stays known: retried once it changes
+            self._failures[key] = failures
+            self._known.pop(key, None)
+            self._observe(path, now)
+
+    def _observe(self, path: Path, now: float) -> None:
+        """Record a candidate file so its size/mtime can settle."""
+        key = str(path)
+        if key in self._pending:
+            return
+        try:
+            st = os.stat(key)
+        except OSError:
+            return
+        if self._known.get(key) == (st.st_size, st.st_mtime_ns):
+            return
+        self._pending[key] = (st.st_size, st.st_mtime_ns, now, now)
+
+    def _promote_settled(self, now: float) -> None:
+        """Queue pending files whose size and mtime have been stable long enough."""
+        for key, (size, mtime_ns, since, first_seen) in list(self._pending.items()):
+            try:
+                st = os.stat(key)
+            except OSError:
+                del self._pending[key]          # gone (moved/deleted by someone else)
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self._pending[key] = (st.st_size, st.st_mtime_ns, now, first_seen)
+            elif now - since >= self.settle:
+                del self._pending[key]
+                self._known[key] = (size, mtime_ns)
+                self._ready.put((Path(key), first_seen))
+
+    # ------------------------------------------------------------------
+    # Moving
+    # ------------------------------------------------------------------
+    def _mover(self, stop: threading.Event) -> None:
+        while not (stop.is_set() and self._ready.empty()):
+            try:
+                first = self._ready.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._ready.get_nowait())
+                except queue.Empty:
+                    break
+
+            job = self.core.make_job(files=[path for path, _ in batch])
+            failed = []
+
+            def on_result(source: Path, status: str, _target, _size):
+                if status in ("error", "cancelled"):
+                    failed.append(source)
+
+            job.on_result = on_result
+            totals = job.run()
+            for path in failed:
+                self._failed.put(path)
+            latency = time.monotonic() - min(seen for _, seen in batch)
+            with self._stats_lock:
+                for key in ("moved", "skipped", "errors"):
+                    self.stats[key] += totals[key]
+                self.stats["batches"] += 1
+                self.stats["last_latency"] = round(latency, 3)
+                self.stats["max_latency"] = max(self.stats["max_latency"], round(latency, 3))
+            if self.on_batch is not None:
+                self.on_batch(self.snapshot())
+
+    def run(self, stop: threading.Event) -> None:
+        """Watch until `stop` is set; files already queued are still sorted."""
+        source = self._open_source()
+        self.stats["mode"] = "inotify" if source else "polling"
+
+        now = time.monotonic()
+        if self.sort_existing:
+            self._rescan(now)
+        else:
+            for path in scan_files(self.source, self.core.scan_options):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                self._known[str(path)] = (st.st_size, st.st_mtime_ns)
+
+        mover = threading.Thread(target=self._mover, args=(stop,), name="filesor-watch-mover", daemon=True)
+        mover.start()
+        tick = max(0.05, min(self.poll_interval, self.settle / 2))
+        last_prune = now
+        try:
+            while not stop.is_set():
+                if source is not None:
+                    names = source.read(tick)
+                    now = time.monotonic()
+                    if names is None:
+                        self._rescan(now)           # event queue overflowed
+                    for name in names or []:
+                        self._observe(self.source / name, now)
+                    if now - last_prune >= self.PRUNE_INTERVAL:
+                        self._prune_known()
+                        last_prune = now
+                else:
+                    stop.wait(tick)
+                    now = time.monotonic()
+                    self._rescan(now)
+                self._retry_failed(now)
+                self._promote_settled(now)
+        finally:
+            stop.set()          # also on Ctrl+C, so the mover drains and exits
+            if source is not None:
+                source.close()
+            mover.join()
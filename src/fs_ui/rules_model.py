@@ -0,0 +1,100 @@
+from typing import Optional
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QSortFilterProxyModel, Qt
+
+from src.core.rule_engine import format_conditions
+
+RULE_ROW_ROLE = Qt.UserRole          # Row of the rule in folder_rules
+SEARCH_ROLE = Qt.UserRole + 1        # Label + path, what the filter box searches
+
+
+class FolderRulesModel(QAbstractListModel):
+    """
+    List model that reads folder_rules directly instead of copying every
+    rule into a QStandardItem. Labels are formatted the first time a row
+    is painted and cached until that rule changes, and edits emit row
+    insert/remove/dataChanged signals so the view only redraws what changed.
+    All rule list mutations made through the UI go through this model.
+    """
+    def __init__(self, folder_rules: list, parent=None):
+        super().__init__(parent)
+        self.folder_rules = folder_rules    # Same list object as UIHandler / FileLogic
+        self._labels = {}                   # id(rule) -> display label
+
+    # ============================
+    # Qt model interface
+    # ============================
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.folder_rules)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.folder_rules):
+            return None
+        rule = self.folder_rules[index.row()]
+        if role == Qt.DisplayRole:
+            return self._label(rule)
+        if role == Qt.ToolTipRole:
+            return rule["path"]
+        if role == RULE_ROW_ROLE:
+            return index.row()
+        if role == SEARCH_ROLE:
+            return self._label(rule) + "\n" + rule["path"]
+        return None
+
+    def _label(self, rule: dict) -> str:
+        label = self._labels.get(id(rule))
+        if label is None:
+            label = rule["name"]
+            if rule["exts"]:
+                label += "  [ " + ", ".join(sorted(rule["exts"])) + " ]"
+            if rule.get("match"):
+                label += "  { " + format_conditions(rule["match"]) + " }"
+            if rule.get("template"):
+                label += "  → " + rule["template"]
+            self._labels[id(rule)] = label
+        return label
+
+    # ============================
+    # Rule list edits
+    # ============================
+
+    def append_rule(self, rule: dict) -> None:
+        row = len(self.folder_rules)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.folder_rules.append(rule)
+        self.endInsertRows()
+
+    def remove_rule(self, row: int) -> dict:
+        self.beginRemoveRows(QModelIndex(), row, row)
+        rule = self.folder_rules.pop(row)
+        self._labels.pop(id(rule), None)
+        self.endRemoveRows()
+        return rule
+
+    def rule_changed(self, row: int) -> None:
+        """Re-format one rule's label after it was edited in place."""
+        self._labels.pop(id(self.folder_rules[row]), None)
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def reset(self) -> None:
+        """Redraw everything after folder_rules was replaced or reloaded."""
+        self.beginResetModel()
+        self._labels.clear()
+        self.endResetModel()
+
+
+class RulesFilterModel(QSortFilterProxyModel):
+    """Case-insensitive search over rule labels and folder paths."""
+    def __init__(self, source: FolderRulesModel, parent=None):
+        super().__init__(parent)
+        self.setSourceModel(source)
+        self.setFilterRole(SEARCH_ROLE)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+    def rule_row(self, index) -> Optional[int]:
+        """Row in folder_rules for a (filtered) view index, or None."""
+        if not index or not index.isValid():
+            return None
+        return self.mapToSource(index).row()
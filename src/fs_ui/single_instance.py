@@ -0,0 +1,135 @@
+import getpass
+import hashlib
+import json
+import os
+import tempfile
+from typing import List
+
+from PySide6.QtCore import QLockFile, QObject, Signal
+from PySide6.QtNetwork import QAbstractSocket, QLocalServer, QLocalSocket
+
+ACK = b"ok\n"
+LOCK_TIMEOUT_MS = 5000      # how long a launch waits for another one that is starting up
+
+
+def server_name() -> str:
+    """Local socket name, one per user so different accounts never share an instance."""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = os.path.expanduser("~")
+    return "FileSor-" + hashlib.sha1(user.encode("utf-8")).hexdigest()[:12]
+
+
+def _instance_running(timeout_ms: int = 200) -> bool:
+    """True if a live instance accepts connections on the socket."""
+    socket = QLocalSocket()
+    socket.connectToServer(server_name())
+    if not socket.waitForConnected(timeout_ms):
+        return False
+    socket.disconnectFromServer()
+    return True
+
+
+def send_to_running(paths: List[str], timeout_ms: int = 1000, ack_timeout_ms: int = 10000) -> bool:
+    """
+    Hand `paths` to an already running FileSor and return without starting
+    a second window. Returns False if no instance is listening (or it did
+    not confirm), in which case the caller starts normally. An instance
+    that is still building its window only answers once its event loop
+    runs, hence the longer `ack_timeout_ms`.
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(server_name())
+    if not socket.waitForConnected(timeout_ms):
+        return False
+    message = json.dumps({"paths": [os.path.abspath(p) for p in paths]}).encode("utf-8") + b"\n"
+    socket.write(message)
+    if not socket.waitForBytesWritten(timeout_ms):
+        return False
+    # The running instance only queues the paths, so the reply comes right away
+    ok = socket.waitForReadyRead(ack_timeout_ms) and bytes(socket.readLine()) == ACK
+    socket.disconnectFromServer()
+    return ok
+
+
+class InstanceServer(QObject):
+    """
+    Listens on the per-user local socket so later launches (e.g. from a
+    file manager's "Send to" / "Open with") forward their paths to this
+    window instead of starting another app. Each message is one JSON line
+    {"paths": [...]}; received paths are emitted through pathsReceived
+    (an empty list when a launch had no paths).
+    """
+    pathsReceived = Signal(list)    # list[str] of absolute paths
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._server = QLocalServer(self)
+        self._server.setSocketOptions(QLocalServer.UserAccessOption)
+        self._server.newConnection.connect(self._on_new_connection)
+        self._buffers = {}
+
+    def claim(self, paths: List[str]) -> bool:
+        """
+        Become the running instance, or hand `paths` to the one that already
+        is. Returns False if they were handed over and this launch should
+        exit. Checking and listening happen under a lock file, so launches
+        started at the same moment cannot both end up opening a window.
+        """
+        lock = QLockFile(os.path.join(tempfile.gettempdir(), server_name() + ".lock"))
+        locked = lock.tryLock(LOCK_TIMEOUT_MS)     # a crashed holder's lock is detected as stale
+        try:
+            if send_to_running(paths):
+                return False
+            self.listen()
+            return True
+        finally:
+            if locked:
+                lock.unlock()
+
+    def listen(self) -> bool:
+        """Start listening; a socket file left behind by a crashed instance is removed first."""
+        name = server_name()
+        if self._server.listen(name):
+            return True
+        if self._server.serverError() == QAbstractSocket.AddressInUseError:
+            if _instance_running():
+                print("Single-instance server unavailable: another instance is listening")
+                return False
+            QLocalServer.removeServer(name)     # nobody answers: the socket is stale
+            if self._server.listen(name):
+                return True
+        print(f"Single-instance server unavailable: {self._server.errorString()}")
+        return False
+
+    def close(self) -> None:
+        self._server.close()
+
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            self._buffers[socket] = b""
+            socket.readyRead.connect(lambda s=socket: self._on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self._on_disconnected(s))
+
+    def _on_ready_read(self, socket: QLocalSocket):
+        data = self._buffers.get(socket, b"") + bytes(socket.readAll())
+        line, sep, rest = data.partition(b"\n")
+        if not sep:
+            self._buffers[socket] = data
+            return
+        self._buffers[socket] = rest
+        try:
+            paths = [str(p) for p in json.loads(line.decode("utf-8")).get("paths", [])]
+        except (ValueError, AttributeError) as e:
+            print(f"Ignoring malformed request from another launch: {e}")
+            socket.disconnectFromServer()
+            return
+        socket.write(ACK)
+        socket.flush()
+        self.pathsReceived.emit(paths)
+
+    def _on_disconnected(self, socket: QLocalSocket):
+        self._buffers.pop(socket, None)
+        socket.deleteLater()
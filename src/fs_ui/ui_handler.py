@@ -1,23 +1,25 @@
 import os
 
-import json
-import pathlib
-import shutil
-
-from PySide6.QtCore import QUrl, Qt, QStandardPaths
-from PySide6.QtGui import QStandardItemModel, QStandardItem, QDesktopServices
-from PySide6.QtWidgets import QInputDialog, QFileDialog, QMenu, QListView, QTreeView, QAbstractItemView, \
-    QMessageBox
+from PySide6.QtCore import Qt, QStandardPaths, QTimer
+from PySide6.QtWidgets import QLabel, QPushButton
 from pathlib import Path
+from typing import Optional
 
+from src.core import rules_io
 from src.core.drop_filter import DropFilter
+from src.fs_ui.rules_model import FolderRulesModel, RulesFilterModel
 from src.fs_utils.app_utils import Helper
 
+# Dialogs, the rules store and optional features (journal, scan index,
+# sniffing, duplicate detection) are imported where they are first used,
+# so none of them is loaded before the window has been painted.
+
 
 class UIHandler:
     def __init__(self, window, logic):
 
         self._rules_loaded = False
+        self._queued_paths = []     # paths handed over before the rules were loaded
         self.window = window
         self.logic = logic
 
@@ -27,15 +29,19 @@ class UIHandler:
         self._drop_filter.filesDropped.connect(self.on_dropzone_files)
         self.window.ui.dragDropButton.clicked.connect(self.on_dropzone_clicked)
 
-        self.folder_model = QStandardItemModel()
-        self.window.ui.folderListView.setModel(self.folder_model)
-
         self.folder_rules = []
         self.logic.bind_folder_rules(self.folder_rules)
 
+        # The view only asks for the rows it paints; labels are built on demand
+        self.folder_model = FolderRulesModel(self.folder_rules, self.window)
+        self.folder_filter = RulesFilterModel(self.folder_model, self.window)
+        self.window.ui.folderListView.setModel(self.folder_filter)
+        self.window.ui.folderListView.setUniformItemSizes(True)
+        self.window.ui.folderFilterEdit.textChanged.connect(self.folder_filter.setFilterFixedString)
 
-        self.load_folder_rules()
-        self.refresh_folder_list()
+        # Rules are loaded by load_after_show; editing waits until then
+        self.window.ui.folderListView.setEnabled(False)
+        self.window.ui.addFolderButton.setEnabled(False)
 
         self.window.ui.folderListView.setContextMenuPolicy(Qt.CustomContextMenu)
         self.window.ui.folderListView.customContextMenuRequested.connect(self.on_list_context_menu)
@@ -43,11 +49,51 @@ class UIHandler:
 
         self.window.ui.addFolderButton.clicked.connect(self.on_add_folder_clicked)
 
+        # Background sort progress lives in the status bar
+        self._progress_label = QLabel()
+        self._cancel_button = QPushButton("Cancel")
+        self._cancel_button.clicked.connect(self.logic.cancel_sorting)
+        status_bar = self.window.statusBar()
+        status_bar.addWidget(self._progress_label, 1)
+        status_bar.addPermanentWidget(self._cancel_button)
+        self._cancel_button.hide()
+        self._pending_jobs = 0
+
+        self.logic.jobs.progress.connect(self.on_sort_progress)
+        self.logic.jobs.pendingChanged.connect(self.on_sort_pending_changed)
+        self.logic.jobs.jobFinished.connect(self.on_sort_finished)
+
+
+
+
+
+    def load_after_show(self):
+        """
+        Startup work deferred until the window has been painted: open the
+        rules store, fill the list, and offer to finish an interrupted sort.
+        """
+        if self._rules_loaded:
+            return
+        from src.core.journal import journal_dir_for
+        from src.core.scan_index import scan_index_for
 
+        self.load_folder_rules()
+        self.refresh_folder_list()
+        self.logic.journal_dir = journal_dir_for(self._rules_path())
+        self.logic.scan_index_path = scan_index_for(self._rules_path())
+        self.window.ui.folderListView.setEnabled(True)
+        self.window.ui.addFolderButton.setEnabled(True)
 
+        # Offer to finish an interrupted sort once the window is up
+        QTimer.singleShot(0, self.logic.offer_resume)
 
+        if self._queued_paths:
+            paths, self._queued_paths = self._queued_paths, []
+            self.on_paths_received(paths)
 
     def on_manual_clicked(self):
+        from PySide6.QtWidgets import QMessageBox
+
         box = QMessageBox(self.window)
         box.setWindowTitle("File Sorter Manual")
         box.setStyleSheet("""
@@ -70,6 +116,8 @@ class UIHandler:
 
     def on_add_folder_clicked(self):
         """Open dialog to add a new destination folder and its allowed extensions."""
+        from PySide6.QtWidgets import QFileDialog, QInputDialog
+
         folder_path = QFileDialog.getExistingDirectory(self.window, "Select Folder")
         if not folder_path:
             return
@@ -87,14 +135,13 @@ class UIHandler:
         exts = Helper.parse_exts(text) if ok else set()
 
         # Save rule and refresh list
-        self.folder_rules.append({
+        self.folder_model.append_rule({
             "path": folder_path,
             "name": os.path.basename(folder_path) or folder_path,
             "exts": exts
         })
 
-        self.save_folder_rules()
-        self.refresh_folder_list()
+        self.on_folder_rules_changed(row=len(self.folder_rules) - 1)
 
     def on_list_context_menu(self, pos):
         """Show right-click menu to edit or remove folder rules."""
@@ -102,8 +149,12 @@ class UIHandler:
         if not index.isValid():
             return
 
+        from PySide6.QtWidgets import QMenu
+
         menu = QMenu(self.window)
         edit_action = menu.addAction("Edit extensions…")
+        conditions_action = menu.addAction("Edit conditions…")
+        template_action = menu.addAction("Edit subfolders…")
         remove_action = menu.addAction("Remove")
         chosen = menu.exec(self.window.ui.folderListView.viewport().mapToGlobal(pos))
         if not chosen:
@@ -111,12 +162,21 @@ class UIHandler:
 
         if chosen == edit_action:
             self.edit_selected_folder_tags(index)
+        elif chosen == conditions_action:
+            self.edit_selected_folder_conditions(index)
+        elif chosen == template_action:
+            self.edit_selected_folder_template(index)
         elif chosen == remove_action:
             self.remove_selected_folder(index)
 
     def on_folder_double_clicked(self, index):
-        item = self.folder_model.itemFromIndex(index)
-        rule_index = item.data(Qt.UserRole)
+        from PySide6.QtCore import QUrl
+        from PySide6.QtGui import QDesktopServices
+        from PySide6.QtWidgets import QMessageBox
+
+        rule_index = self.folder_filter.rule_row(index)
+        if rule_index is None:
+            return
         folder_path = self.folder_rules[rule_index].get("path", "")
 
         if not folder_path:
@@ -135,16 +195,14 @@ class UIHandler:
             )
             return
 
-        print("rule: ", rule_index)
         QDesktopServices.openUrl(QUrl.fromLocalFile(folder_path))
 
     def edit_selected_folder_tags(self, index):
-        if not index or not index.isValid():
+        row = self.folder_filter.rule_row(index)
+        if row is None or row >= len(self.folder_rules):
             return
 
-        row = index.row()
-        if row < 0 or row >= len(self.folder_rules):
-            return
+        from PySide6.QtWidgets import QInputDialog
 
         rule = self.folder_rules[row]
         current = ", ".join(sorted(e.lstrip(".") for e in rule.get("exts", set())))
@@ -160,17 +218,79 @@ class UIHandler:
 
         rule["exts"] = Helper.parse_exts(text)
 
-        self.save_folder_rules()
-        self.refresh_folder_list()
+        self.on_folder_rules_changed(row=row)
 
-    def remove_selected_folder(self, index):
-        if not index or not index.isValid():
+    def edit_selected_folder_conditions(self, index):
+        row = self.folder_filter.rule_row(index)
+        if row is None or row >= len(self.folder_rules):
             return
 
-        row = index.row()
-        if row < 0 or row >= len(self.folder_rules):
+        from PySide6.QtWidgets import QInputDialog, QMessageBox
+        from src.core.rule_engine import format_conditions, parse_conditions
+
+        rule = self.folder_rules[row]
+        text, ok = QInputDialog.getText(
+            self.window,
+            f"Edit conditions for {rule.get('name', '')}",
+            "Only sort files matching all of (leave empty for extensions only):\n"
+            "name:IMG_*  regex:^inv-\\d+  path:~/Scans  size>10M  size<1G  age>30d  age<2h",
+            text=format_conditions(rule.get("match"))
+        )
+        if not ok:
+            return
+
+        try:
+            match = parse_conditions(text)
+        except ValueError as e:
+            QMessageBox.warning(self.window, "Invalid Conditions", str(e))
+            return
+        if match:
+            rule["match"] = match
+        else:
+            rule.pop("match", None)
+
+        self.on_folder_rules_changed(row=row)
+
+    def edit_selected_folder_template(self, index):
+        row = self.folder_filter.rule_row(index)
+        if row is None or row >= len(self.folder_rules):
             return
 
+        from PySide6.QtWidgets import QInputDialog, QMessageBox
+        from src.core.destinations import validate_template
+
+        rule = self.folder_rules[row]
+        text, ok = QInputDialog.getText(
+            self.window,
+            f"Edit subfolders for {rule.get('name', '')}",
+            "Subfolders to create per file (leave empty to keep files flat):\n"
+            "Example: {mtime:%Y}/{mtime:%m}   or   {ext}/{shard}\n"
+            "Fields: {mtime:<format>} {ext} {size} {shard} {shard:N} {rule}",
+            text=rule.get("template", "")
+        )
+        if not ok:
+            return
+
+        text = text.strip()
+        if text:
+            try:
+                validate_template(text)
+            except ValueError as e:
+                QMessageBox.warning(self.window, "Invalid Subfolders", str(e))
+                return
+            rule["template"] = text
+        else:
+            rule.pop("template", None)
+
+        self.on_folder_rules_changed(row=row)
+
+    def remove_selected_folder(self, index):
+        row = self.folder_filter.rule_row(index)
+        if row is None or row >= len(self.folder_rules):
+            return
+
+        from PySide6.QtWidgets import QMessageBox
+
         rule = self.folder_rules[row]
 
         reply = QMessageBox.question(
@@ -181,44 +301,82 @@ class UIHandler:
         if reply != QMessageBox.Yes:
             return
 
-        del self.folder_rules[row]
-
-        self.save_folder_rules()
-        self.refresh_folder_list()
+        self.folder_model.remove_rule(row)
+
+        self.on_folder_rules_changed(removed=rule)
+
+    def on_folder_rules_changed(self, row: Optional[int] = None, removed: Optional[dict] = None):
+        """
+        Invalidate the compiled rule index, persist and redraw after any rule edit.
+        Only the rule at `row` (added or edited) or the `removed` rule is
+        written and redrawn; without either the whole list is saved.
+        """
+        self.logic.invalidate_rule_index()
+        if row is not None:
+            self.rules_store.upsert(self.folder_rules[row])
+            self.folder_model.rule_changed(row)
+        elif removed is not None:
+            self.rules_store.delete(removed)
+        else:
+            self.save_folder_rules()
+            self.refresh_folder_list()
 
     def refresh_folder_list(self):
-        """Rebuild the ListView based on current folder_rules."""
-        self.folder_model.clear()
-
-        for row, rule in enumerate(self.folder_rules):
-            label = rule["name"]
-            if rule["exts"]:
-                label += "  [ " + ", ".join(sorted(rule["exts"])) + " ]"
-
-            item = QStandardItem(label)
-            item.setEditable(False)
-            item.setToolTip(rule["path"])
-
-            item.setData(row, Qt.UserRole)
-
-            self.folder_model.appendRow(item)
+        """Redraw the whole ListView after folder_rules was reloaded or replaced."""
+        self.folder_model.reset()
 
     # =====================================================================
     # Drag/Drop and Click Handlers
     # =====================================================================
     def on_dropzone_files(self, paths: list):
-        """Triggered when files/folders are dropped onto the drop zone."""
-        path_objs = [Path(p) for p in paths if p]
-        dirs = [p for p in path_objs if p.is_dir()]
-        if dirs:
-            self.logic.sort_files_from_directory(dirs[0])
+        """Triggered when files/folders are dropped onto the drop zone; the whole drop is one sort."""
+        self.logic.sort_paths([Path(p) for p in paths if p])
+
+    def on_paths_received(self, paths: list):
+        """
+        Sort paths given on the command line or forwarded by a later launch
+        (see InstanceServer); they wait for the rules if those are not loaded yet.
+        A launch without paths just brings this window to the front.
+        """
+        if not paths:
+            self.window.showNormal()
+            self.window.raise_()
+            self.window.activateWindow()
             return
-        files = [p for p in path_objs if p.is_file()]
-        if files:
-            self.logic.sort_individual_files(files)
+        if not self._rules_loaded:
+            self._queued_paths.extend(paths)
+            return
+        self.logic.sort_paths([Path(p) for p in paths if p])
+
+    def on_preview_clicked(self):
+        """Pick a folder and show a dry-run plan of how it would be sorted."""
+        from PySide6.QtWidgets import QFileDialog
+
+        source_dir = QFileDialog.getExistingDirectory(self.window, "Select Folder to Preview")
+        if not source_dir:
+            return
+        self.logic.preview_directory(Path(source_dir))
+
+    def on_recursive_toggled(self, checked: bool):
+        """Toggle whether dropped folders are sorted including their subfolders."""
+        self.logic.scan_options.recursive = checked
+
+    def on_sniff_toggled(self, checked: bool):
+        """Toggle sorting files with a missing or unknown extension by their content."""
+        from src.core.sniffer import ContentSniffer, sniff_cache_for
+
+        self.logic.content_sniffer = ContentSniffer(sniff_cache_for(self._rules_path())) if checked else None
+
+    def on_duplicates_toggled(self, checked: bool):
+        """Toggle leaving files in place when an identical copy is already at the destination."""
+        from src.core.dedupe import Deduplicator, hash_index_for
+
+        self.logic.deduplicator = Deduplicator(hash_index_for(self._rules_path())) if checked else None
 
     def on_dropzone_clicked(self):
         """Open a unified file dialog allowing both files and folders to be selected."""
+        from PySide6.QtWidgets import QAbstractItemView, QFileDialog, QListView, QTreeView
+
         dlg = QFileDialog(self.window, "Select files and/or folders")
         dlg.setDirectory(str(Path.home()))
         dlg.setOption(QFileDialog.DontUseNativeDialog, True)  # Enables folder selection
@@ -240,14 +398,36 @@ class UIHandler:
         if not paths:
             return
 
-        # Separate files and folders, process each appropriately
-        files = [p for p in paths if p.is_file()]
-        dirs = [p for p in paths if p.is_dir()]
+        # Files and folders are sorted together as one job
+        self.logic.sort_paths(paths)
 
-        if files:
-            self.logic.sort_individual_files(files)
-        for d in dirs:
-            self.logic.sort_files_from_directory(d)
+    # =====================================================================
+    # Background sort progress
+    # =====================================================================
+    def on_sort_progress(self, totals: dict):
+        """Show live counters of the running sort job."""
+        if totals.get("undo"):
+            text = f"Undoing… restored {totals['moved']} of {totals['scanned']} checked"
+        elif totals.get("planning"):
+            text = f"Planning… scanned {totals['scanned']} ({Helper.format_bytes(totals['bytes'])} to move)"
+        else:
+            # Bytes of large files still being copied count as they go
+            text = (f"Sorting… scanned {totals['scanned']}, moved {totals['moved']} "
+                    f"({Helper.format_bytes(totals['bytes'] + totals.get('copying', 0))})")
+        if self._pending_jobs:
+            text += f"  |  {self._pending_jobs} queued"
+        self._progress_label.setText(text)
+        self._cancel_button.show()
+
+    def on_sort_pending_changed(self, pending: int):
+        self._pending_jobs = pending
+
+    def on_sort_finished(self, totals: dict):
+        """Clear the status bar once the queue has drained."""
+        if self._pending_jobs or self.logic.jobs.is_busy():
+            return
+        self._progress_label.clear()
+        self._cancel_button.hide()
 
     # ============================
     # Folder rules persistence
@@ -257,97 +437,61 @@ class UIHandler:
         """Return path to the local rules file."""
         base = Path(QStandardPaths.writableLocation(QStandardPaths.AppDataLocation))
         base.mkdir(parents=True, exist_ok=True)
-        return base / "folder_rules.json"
+        return base / rules_io.RULES_FILENAME
 
     def save_folder_rules(self) -> None:
-        """Save folder_rules to disk as JSON (safe/atomic)."""
-
-        #debug
-        print("save called, rules len =", len(self.folder_rules))
-
-        path = self._rules_path()
-        tmp = path.with_suffix(path.suffix + ".tmp")
-        bak = path.with_suffix(path.suffix + ".bak")
-
+        """Write the complete rule list to the rules store in one transaction."""
         # Doesn't save before loaded
         if not getattr(self, "_rules_loaded", False):
             print("Skipping save: rules not loaded yet.")
             return
 
-        # Build serializable data
-        data = []
-        for r in self.folder_rules:
-            data.append({
-                "name": r.get("name", ""),
-                "path": r.get("path", ""),
-                "exts": sorted(list(r.get("exts", set()))),
-            })
-
-        # Backup existing file
-        if path.exists():
-            shutil.copy2(path, bak)
-
-        # Atomic write: write temp, then replace
-        tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
-        tmp.replace(path)
-        print("Replacing temp with path")
-        print("rules len after replacement=", len(self.folder_rules))
-
-        print("Saving to:", self._rules_path())
-        print("rules:", self.folder_rules)
+        self.rules_store.replace_all(self.folder_rules)
 
     def load_folder_rules(self) -> None:
-        """Load folder_rules from disk if present (with recovery)."""
-        path = self._rules_path()
-        bak = path.with_suffix(path.suffix + ".bak")
-
-        def _load(p: Path):
-            raw_text = p.read_text(encoding="utf-8").strip()
-            if not raw_text:
-                raise ValueError("rules file is empty")
-            return json.loads(raw_text)
+        """Load folder_rules from the rules store, migrating folder_rules.json on first start."""
+        from src.core.rules_store import RulesStore, store_path_for
 
+        self.rules_store = RulesStore(store_path_for(self._rules_path()))
+        if self.rules_store.migrate_from_json(self._rules_path()):
+            print("Migrated rules from", self._rules_path())
+        loaded_rules = self.rules_store.load()
 
+        self.folder_rules.clear()
+        self.folder_rules.extend(loaded_rules)
+        self.logic.invalidate_rule_index()
+        self._rules_loaded = True
 
-        raw = None
-        if path.exists():
-            try:
-                raw = _load(path)
-            except Exception as e:
-                print(f"Failed to load rules from {path}: {e}")
+    def close_rules_store(self) -> None:
+        """Every edit is already stored; just release the database."""
+        if getattr(self, "_rules_loaded", False):
+            self.rules_store.close()
 
-        if raw is None and bak.exists():
-            try:
-                raw = _load(bak)
-                print("Recovered rules from backup.")
-            except Exception as e:
-                print(f"Failed to load rules from {bak}: {e}")
-
-        if raw is None:
-            self.folder_rules.clear()
-            self._rules_loaded = True
+    def on_import_rules_clicked(self):
+        """Add the rules from a shared JSON file, skipping folders that already have a rule."""
+        if not self._rules_loaded:
             return
+        from PySide6.QtWidgets import QFileDialog, QMessageBox
+        from src.core.rules_store import RulesStore
 
-        if not isinstance(raw, list):
-            print(f"Rules file has wrong format (expected list, got {type(raw).__name__})")
-            self.folder_rules = []
-            self._rules_loaded = True
+        path, _ = QFileDialog.getOpenFileName(self.window, "Import Rules", str(Path.home()), "Rules (*.json)")
+        if not path:
             return
+        known = {rule["path"] for rule in self.folder_rules}
+        added = [rule for rule in RulesStore.import_json(Path(path)) if rule["path"] not in known]
+        self.folder_rules.extend(added)
+        self.rules_store.replace_all(self.folder_rules)
+        self.logic.invalidate_rule_index()
+        self.refresh_folder_list()
+        QMessageBox.information(self.window, "Import Rules", f"Imported {len(added)} rule(s).")
 
-        loaded_rules = []
-        for r in raw:
-            if not isinstance(r, dict):
-                continue
-            loaded_rules.append({
-                "name": r.get("name", ""),
-                "path": r.get("path", ""),
-                "exts": set(r.get("exts", [])),
-            })
-
-        print("Loaded from:", path, "exists:", path.exists())
-        print("Loaded count:", len(loaded_rules))
-
-        self.folder_rules.clear()
-        self.folder_rules.extend(loaded_rules)
-        self._rules_loaded = True
+    def on_export_rules_clicked(self):
+        """Save all rules as JSON, e.g. to share them or use them with the CLI."""
+        from PySide6.QtWidgets import QFileDialog
+        from src.core.rules_store import RulesStore
 
+        path, _ = QFileDialog.getSaveFileName(self.window, "Export Rules", str(Path.home() / rules_io.RULES_FILENAME),
+                                              "Rules (*.json)")
+        if not path:
+            return
+        RulesStore.export_json(Path(path), self.folder_rules)
@@ -0,0 +1,203 @@
+import hashlib
+import importlib.util
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Optional
+
+import PySide6
+from PySide6.QtCore import QCoreApplication, QProcess, QStandardPaths
+from PySide6.QtWidgets import QWidget
+
+# First line of a cached module: "# filesor-ui <hash of the .ui + PySide6 version>"
+CACHE_HEADER = "# filesor-ui "
+
+_compile_process: Optional[QProcess] = None     # background uic run, if one is going
+
+
+def ui_key(ui_path: Path) -> str:
+    """Identifies one .ui file content compiled by one PySide6 version."""
+    digest = hashlib.sha1(ui_path.read_bytes())
+    digest.update(PySide6.__version__.encode())
+    return digest.hexdigest()
+
+
+def cached_module_path(ui_path: Path) -> Path:
+    """Where the pyside6-uic output for `ui_path` is cached (per user, survives updates)."""
+    base = Path(QStandardPaths.writableLocation(QStandardPaths.CacheLocation))
+    return base / "ui" / f"ui_{ui_path.stem}.py"
+
+
+def find_uic() -> Optional[str]:
+    """pyside6-uic next to the running interpreter, else on PATH; None in frozen builds."""
+    if getattr(sys, "frozen", False):
+        return None
+    scripts = Path(sys.executable).parent
+    for name in ("pyside6-uic", "pyside6-uic.exe"):
+        candidate = scripts / name
+        if candidate.exists():
+            return str(candidate)
+    return shutil.which("pyside6-uic")
+
+
+def _finish_compile(ui_path: Path, tmp: Path, target: Path) -> bool:
+    """Stamp uic's output with the .ui key and move it into place."""
+    try:
+        code = tmp.read_text(encoding="utf-8")
+        # The .ui lists Icons.qrc but uses none of its images, and no Icons_rc module is built
+        code = re.sub(r"^import \w+_rc\s*$", "", code, flags=re.MULTILINE)
+        tmp.write_text(CACHE_HEADER + ui_key(ui_path) + "\n" + code, encoding="utf-8")
+        os.replace(tmp, target)
+        return True
+    except OSError as e:
+        print(f"Could not cache compiled UI {target}: {e}")
+        return False
+
+
+def _remove_tmp(tmp: Path) -> None:
+    try:
+        tmp.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Could not remove {tmp}: {e}")
+
+
+def compile_ui(ui_path: Path, wait: bool = False) -> bool:
+    """
+    Run pyside6-uic on `ui_path` into the cache. By default it runs in the
+    background (QProcess) so it never delays startup; the next launch picks
+    the result up. With `wait` it blocks, e.g. to warm the cache at install time.
+    A background compile still running when the app quits is killed, and a
+    failed or aborted compile leaves no partial file behind.
+    """
+    global _compile_process
+    uic = find_uic()
+    if uic is None or _compile_process is not None:
+        return False
+    target = cached_module_path(ui_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(".tmp")
+
+    if wait:
+        process = QProcess()
+        process.setProgram(uic)
+        process.setArguments([str(ui_path), "-o", str(tmp)])
+        process.start()
+        ok = process.waitForFinished(60000) and process.exitCode() == 0
+        if ok and _finish_compile(ui_path, tmp, target):
+            return True
+        process.kill()
+        process.waitForFinished(1000)
+        _remove_tmp(tmp)
+        return False
+
+    app = QCoreApplication.instance()
+    if app is None:
+        return False
+    # Owned by the application so it is never destroyed while uic still runs
+    process = QProcess(app)
+    process.setProgram(uic)
+    process.setArguments([str(ui_path), "-o", str(tmp)])
+
+    def finished(exit_code, status):
+        global _compile_process
+        if _compile_process is not process:
+            return      # already aborted at quit
+        _compile_process = None
+        if status != QProcess.NormalExit or exit_code != 0:
+            print(f"pyside6-uic failed for {ui_path}: {bytes(process.readAllStandardError()).decode(errors='replace')}")
+            _remove_tmp(tmp)
+        elif not _finish_compile(ui_path, tmp, target):
+            _remove_tmp(tmp)
+        process.deleteLater()
+
+    def error(err):
+        global _compile_process
+        # A process that never started emits no finished signal
+        if err == QProcess.FailedToStart and _compile_process is process:
+            _compile_process = None
+            print(f"Could not start pyside6-uic: {process.errorString()}")
+            process.deleteLater()
+
+    def about_to_quit():
+        global _compile_process
+        if _compile_process is not process:
+            return
+        _compile_process = None
+        process.kill()
+        process.waitForFinished(1000)
+        _remove_tmp(tmp)
+
+    process.finished.connect(finished)
+    process.errorOccurred.connect(error)
+    app.aboutToQuit.connect(about_to_quit)
+    _compile_process = process
+    process.start()
+    return True
+
+
+def _load_cached(ui_path: Path, parent) -> Optional[QWidget]:
+    """Build the form from the cached uic module, or None if it is missing or stale."""
+    module_path = cached_module_path(ui_path)
+    try:
+        with open(module_path, encoding="utf-8") as f:
+            header = f.readline().strip()
+    except OSError:
+        return None
+    if header != CACHE_HEADER + ui_key(ui_path):
+        return None
+    try:
+        spec = importlib.util.spec_from_file_location(module_path.stem, module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        form = next(cls for name, cls in vars(module).items() if name.startswith("Ui_"))()
+    except Exception as e:
+        print(f"Ignoring cached UI {module_path}: {e}")
+        return None
+    widget = QWidget(parent)
+    form.setupUi(widget)
+    # Expose child widgets as attributes, the same way QUiLoader does
+    for name, child in vars(form).items():
+        setattr(widget, name, child)
+    return widget
+
+
+def load_ui(ui_path: Path, parent=None, use_cache: bool = True) -> QWidget:
+    """
+    Create the widget described by a Qt Designer file.
+    The precompiled (pyside6-uic) form is used when it is cached for this
+    exact .ui file; otherwise the file is parsed with QUiLoader, and a
+    compile is started in the background for the next launch.
+    """
+    if use_cache:
+        widget = _load_cached(ui_path, parent)
+        if widget is not None:
+            return widget
+
+    # QtUiTools is a separate binding module only needed for this fallback
+    from PySide6.QtCore import QFile, QIODevice
+    from PySide6.QtUiTools import QUiLoader
+
+    f = QFile(str(ui_path))
+    f.open(QIODevice.ReadOnly)
+    widget = QUiLoader().load(f, parent)
+    f.close()
+    if use_cache:
+        compile_ui(ui_path)
+    return widget
+
+
+# Warm the cache ahead of the first launch, e.g. from an installer:
+#   python -m src.fs_ui.ui_loader
+if __name__ == "__main__":
+    from src.fs_utils.app_utils import Helper
+
+    app = QCoreApplication(sys.argv)
+    app.setApplicationName("FileSor")
+    ui_file = Helper.resource_path("src/fs_ui/FileSorterMain.ui")
+    ok = compile_ui(ui_file, wait=True)
+    print(("Cached " if ok else "Could not compile ") + str(cached_module_path(ui_file)))
+    sys.exit(0 if ok else 1)
@@ -1,8 +1,6 @@
 import sys
 from pathlib import Path
 
-from PySide6.QtGui import QStandardItem
-
 
 class Helper:
 
@@ -38,15 +36,10 @@ class Helper:
         return exts
 
     @staticmethod
-    def refresh_folder_list(self):
-        """Rebuild the ListView based on current folder_rules."""
-        self.folder_model.clear()
-        for rule in self.folder_rules:
-            label = rule["name"]
-            if rule["exts"]:
-                label += "  [ " + ", ".join(sorted(rule["exts"])) + " ]"
-            item = QStandardItem(label)
-            item.setEditable(False)
-            item.setToolTip(rule["path"])
-            self.folder_model.appendRow(item)
-
+    def format_bytes(size: int) -> str:
+        """Format a byte count for display, e.g. 1536 -> '1.5 KB'."""
+        value = float(size)
+        for unit in ("B", "KB", "MB", "GB", "TB"):
+            if value < 1024 or unit == "TB":
+                return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+            value /= 1024